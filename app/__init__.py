@@ -1,36 +1,58 @@
 import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flasgger import Swagger
 
 
 
 db = SQLAlchemy()
 
 
-def create_app():
+def is_new_sqlite_file(url):
+    """
+    True for a SQLite file database that does not exist yet. Other databases
+    get their tables from migrate_db.py.
+    """
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return False
+    return not os.path.exists(url.database)
+
+
+def create_app(config=None):
     app = Flask(__name__)
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///warehouse.db"
-    db.init_app(app)
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
+        "DATABASE_URL", "sqlite:///warehouse.db"
+    )
+    app.config["INSTRUMENTATION_ENABLED"] = (
+        os.environ.get("WAREHOUSE_INSTRUMENTATION") == "1"
+    )
+    if config:
+        app.config.update(config)
+
+    from .db_profiles import (
+        apply_engine_options,
+        install_sqlite_pragmas,
+        select_profile_name,
+    )
 
-    swagger = Swagger(
-        app,
-        template={
-            "info": {
-                "title": "My Flask API",
-                "description": "An example API using Flask and Swagger",
-                "version": "1.0.0",
-            }
-        },
+    app.config.setdefault(
+        "DATABASE_PROFILE",
+        select_profile_name(app.config["SQLALCHEMY_DATABASE_URI"]),
     )
+    profile = apply_engine_options(app)
+    db.init_app(app)
 
     with app.app_context():
         from . import models
         from .controllers import main
+        from .docs import init_docs
+        from .instrumentation import init_instrumentation
 
+        install_sqlite_pragmas(db.engine, profile["sqlite_pragmas"])
+        init_instrumentation(app, db.engine)
         app.register_blueprint(main)
+        init_docs(app)
 
-        if not os.path.exists('warehouse.db'):
+        if is_new_sqlite_file(db.engine.url):
             db.create_all()
 
     return app
@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheBackend:
+    """
+    Interface for cache storage.
+
+    Values are plain dicts, so a shared backend (Redis, memcached) only has to
+    serialize them as JSON. `get` returns None on a miss. A backend whose
+    entries every worker process sees sets `shared`; the prefork server
+    turns caching off rather than run several workers on one that does not.
+    """
+
+    shared = False
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+    def delete(self, *keys):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        return 0
+
+
+class LRUCache(CacheBackend):
+    """
+    In-process cache that evicts the least recently used entry when full and
+    drops entries older than `ttl` seconds.
+    """
+
+    def __init__(self, max_entries=10000, ttl=60, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class NullCache(CacheBackend):
+    """
+    Stores nothing, so every read goes to the database.
+    """
+
+    shared = True
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+class ReadThroughCache:
+    """
+    Wraps a backend with read-through loading and hit/miss counters.
+
+    A load reads a snapshot that a concurrent write may invalidate before the
+    load stores it. Every invalidation therefore gets a sequence number, and
+    a fill is dropped when its key was invalidated after the load started.
+    The numbers are only kept while a load is in flight.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.sequence = 0
+        self._invalidated = {}
+        self._loads_in_flight = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader):
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        with self._lock:
+            self._loads_in_flight += 1
+            since = self.sequence
+        try:
+            value = loader()
+            if value is not None:
+                self.set(key, value, since)
+        finally:
+            with self._lock:
+                self._loads_in_flight -= 1
+                if not self._loads_in_flight:
+                    self._invalidated.clear()
+        return value
+
+    def set(self, key, value, since=None):
+        """
+        Store `value`. A loader filling other keys passes the `sequence` it
+        read before querying as `since`, so a value invalidated in between
+        is not stored.
+        """
+        with self._lock:
+            if since is not None and self._invalidated.get(key, since) > since:
+                return
+            self.backend.set(key, value)
+
+    def invalidate(self, *keys):
+        if not keys:
+            return
+        with self._lock:
+            self.sequence += 1
+            if self._loads_in_flight:
+                for key in keys:
+                    self._invalidated[key] = self.sequence
+            self.backend.delete(*keys)
+
+    def clear(self):
+        self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.backend)}
+
+
+class CachedRecord:
+    """
+    Read-only stand-in for a model instance, built from its cached to_dict().
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data):
+        self._data = data
+
+    def __getattr__(self, name):
+        try:
+            return self._data[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def to_dict(self):
+        return dict(self._data)
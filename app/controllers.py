@@ -1,58 +1,375 @@
+import functools
+import hashlib
+import json
 import logging
-from flask import Blueprint, jsonify, request, render_template
-from flasgger import swag_from
-from jsonschema import validate, ValidationError
-from .services import SectionService, ProductService
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    jsonify,
+    make_response,
+    request,
+    render_template,
+    stream_with_context,
+    url_for,
+)
+from jsonschema import ValidationError
+from .services import (
+    ChangeService,
+    SectionService,
+    ProductService,
+    TableVersionService,
+    rows_to_dicts,
+    service_cache,
+)
+from .cache import LRUCache, ReadThroughCache
+from .docs import swag_from
 from .exceptions import (
     SectionNotFoundException,
     SectionAlreadyExistsException,
     ProductNotFoundException,
     ProductAlreadyExistsException,
     InvalidSectionException,
+    InvalidPaginationException,
+    InvalidFilterException,
+    InsufficientStockException,
+)
+from .filtering import (
+    MAX_DELETE_CHUNK_SIZE,
+    PRODUCT_FIELDS,
+    PRODUCT_SORT_FIELDS,
+    SECTION_FIELDS,
+    parse_chunk_size,
+    parse_fields,
+    parse_product_filters,
+    parse_product_sort,
+    parse_search_terms,
+)
+from .instrumentation import finish_request_timing, start_request_timing
+from .models import DATABASE_EPOCH
+from .pagination import encode_cursor, parse_page_args, parse_since_args
+from .schema import (
+    section_schema,
+    product_schema,
+    stock_movement_schema,
+    batch_stock_movement_schema,
+    batch_get_schema,
+    section_patch_schema,
+    product_patch_schema,
+)
+from .validation import (
+    batch_stock_movement_validator,
+    product_validator,
+    validate_batch_get,
+    validate_many,
+    validate_product,
+    validate_product_patch,
+    validate_section,
+    validate_section_patch,
+    validate_stock_movement,
 )
-from .schema import section_schema, product_schema
 
 controller_logger = logging.getLogger('controller_logger')
 main = Blueprint("main", __name__)
 
 
+@main.before_request
+def start_timing():
+    start_request_timing(current_app.config)
+
+
+@main.after_request
+def add_server_timing(response):
+    return finish_request_timing(response, current_app.config)
+
+
 def handle_exception(e, status_code):
-    controller_logger.error(str(e))
+    controller_logger.error("%s", e)
     return jsonify({"error": str(e)}), status_code
 
+
+page_parameters = [
+    {
+        "name": "limit",
+        "in": "query",
+        "type": "integer",
+        "required": False,
+        "description": "Maximum number of items to return (1-1000)",
+    },
+    {
+        "name": "cursor",
+        "in": "query",
+        "type": "string",
+        "required": False,
+        "description": "Opaque cursor taken from the Link header of the previous page",
+    },
+]
+
+
+def etag_from_versions(*table_names):
+    """
+    Tag the response with a strong ETag derived from the database epoch, the
+    change counters of `table_names` and the request URL. A matching
+    If-None-Match is answered with 304 before the view runs, so no rows are
+    read or serialized.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = TableVersionService.get_versions(DATABASE_EPOCH, *table_names)
+            etag = hashlib.sha1(f"{request.full_path}:{versions}".encode()).hexdigest()
+            if request.if_none_match.contains(etag):
+                response = make_response("", 304)
+                response.set_etag(etag)
+                return response
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+            return response
+        return wrapper
+    return decorator
+
+
+def fields_parameter(fields):
+    return {
+        "name": "fields",
+        "in": "query",
+        "type": "string",
+        "required": False,
+        "description": "Comma-separated fields to return, some of "
+        + ", ".join(fields),
+    }
+
+
+chunk_size_parameter = {
+    "name": "chunk_size",
+    "in": "query",
+    "type": "integer",
+    "required": False,
+    "minimum": 1,
+    "maximum": MAX_DELETE_CHUNK_SIZE,
+    "description": "Delete products this many per transaction instead of all "
+    "in one, so other writers are not held up by a large purge",
+}
+
+
+def batch_get_spec(fields, description, example):
+    return {
+        "parameters": [
+            {
+                "name": "body",
+                "in": "body",
+                "required": True,
+                "schema": batch_get_schema,
+                "description": "IDs to fetch, at most 1000",
+            },
+            fields_parameter(fields),
+        ],
+        "responses": {
+            "200": {
+                "description": description
+                + " in request order, and the IDs that do not exist",
+                "examples": {"application/json": example},
+            },
+            "400": {"description": "Invalid data or fields"},
+        },
+    }
+
+
+def batch_get_response(fetch, allowed_fields):
+    data = request.get_json()
+    try:
+        validate_batch_get(data)
+        fields = parse_fields(request.args, allowed_fields)
+    except ValidationError as e:
+        return handle_exception(f"Invalid data: {e.message}", 400)
+    except InvalidFilterException as e:
+        return handle_exception(e, 400)
+    rows, missing = fetch(data["ids"], fields)
+    return jsonify({"items": rows_to_dicts(fields, rows), "missing": missing}), 200
+
+
+def paged_response(data, next_position, endpoint, limit):
+    response = jsonify(data)
+    if next_position is not None:
+        args = request.args.to_dict()
+        args.update(limit=limit, cursor=encode_cursor(next_position))
+        next_url = url_for(endpoint, **args)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return response, 200
+
+
+product_filter_parameters = [
+    {
+        "name": "section_id",
+        "in": "query",
+        "type": "integer",
+        "required": False,
+        "description": "Only products of this section",
+    },
+    {
+        "name": "available",
+        "in": "query",
+        "type": "boolean",
+        "required": False,
+        "description": "Only available (true) or unavailable (false) products",
+    },
+    {
+        "name": "min_price",
+        "in": "query",
+        "type": "number",
+        "required": False,
+        "description": "Minimum price per unit, inclusive",
+    },
+    {
+        "name": "max_price",
+        "in": "query",
+        "type": "number",
+        "required": False,
+        "description": "Maximum price per unit, inclusive",
+    },
+    {
+        "name": "max_quantity",
+        "in": "query",
+        "type": "integer",
+        "required": False,
+        "description": "Maximum quantity in stock, inclusive, for low-stock reports",
+    },
+    {
+        "name": "name_prefix",
+        "in": "query",
+        "type": "string",
+        "required": False,
+        "description": "Case-sensitive product name prefix",
+    },
+    {
+        "name": "sort",
+        "in": "query",
+        "type": "string",
+        "required": False,
+        "enum": [
+            f"{direction}{field}"
+            for field in PRODUCT_SORT_FIELDS
+            for direction in ("", "-")
+        ],
+        "default": "product_id",
+        "description": "Sort column, prefixed with - for descending",
+    },
+]
+
+HOME_PRODUCT_LIMIT = 50
+HOME_SECTION_LIMIT = 100
+
+# Rendered default home pages, keyed by table versions. Entries of older
+# versions are never read again, so a few slots are enough. The cache is
+# per process and stays on with several workers: the versions are read from
+# the database, so a write in one worker moves every worker to a new key.
+home_page_cache = ReadThroughCache(LRUCache(max_entries=4))
+
+
+def render_home(limit, after):
+    products, next_position = ProductService.get_products_page(limit, after)
+    summaries, more_sections = SectionService.get_section_summaries(
+        HOME_SECTION_LIMIT
+    )
+    next_url = None
+    if next_position is not None:
+        next_url = url_for(
+            "main.home", limit=limit, cursor=encode_cursor(next_position)
+        )
+    html = render_template(
+        "index.html",
+        summaries=summaries,
+        more_sections=more_sections,
+        products=products,
+        next_url=next_url,
+        first_page=after is None,
+    )
+    return {"html": html}
+
+
 @main.route("/")
 def home():
+    """
+    One page of products and the summaries of the first sections.
+
+    The default first page is cached under the table versions, so any
+    service write moves later views to a new key and repeated views cost
+    one version lookup. Other pages are rendered on every request.
+    """
     controller_logger.info("Home page accessed")
-    return render_template(
-        "index.html",
-        sections=SectionService.get_all_sections(),
-        products=ProductService.get_all_products(),
-    )
+    try:
+        limit, after = parse_page_args(request.args) or (HOME_PRODUCT_LIMIT, None)
+        if limit != HOME_PRODUCT_LIMIT or after is not None:
+            return render_home(limit, after)["html"]
+        epoch, products, sections = TableVersionService.get_versions(
+            DATABASE_EPOCH, "products", "sections"
+        )
+        page = home_page_cache.get_or_load(
+            f"home:{epoch}:{products}:{sections}",
+            lambda: render_home(limit, after),
+        )
+    except InvalidPaginationException as e:
+        return handle_exception(e, 400)
+    return page["html"]
 
 @main.route("/sections", methods=["GET"])
 @swag_from(
     {
-        "parameters": [],
+        "parameters": page_parameters + [fields_parameter(SECTION_FIELDS)],
         "responses": {
             "200": {
-                "description": "List of all sections",
+                "description": "List of sections, paginated when limit or cursor is given",
                 "examples": {
                     "application/json": [
                         {"section_id": 1, "section_name": "Electronics"},
                         {"section_id": 2, "section_name": "Food and Beverages"},
                     ]
                 },
-            }
+            },
+            "304": {"description": "Not modified since the ETag in If-None-Match"},
+            "400": {"description": "Invalid limit, cursor or fields"},
         },
     }
 )
+@etag_from_versions("sections")
 def get_sections():
     """
     Get all sections.
     """
-    sections = SectionService.get_all_sections()
+    try:
+        page = parse_page_args(request.args)
+        fields = parse_fields(request.args, SECTION_FIELDS)
+        if page is not None:
+            limit, after_id = page
+            rows, next_after_id = SectionService.get_section_rows(fields, limit, after_id)
+            return paged_response(
+                rows_to_dicts(fields, rows), next_after_id, "main.get_sections", limit
+            )
+    except (InvalidPaginationException, InvalidFilterException) as e:
+        return handle_exception(e, 400)
+
     controller_logger.info("Fetching all sections")
-    return jsonify([section.to_dict() for section in SectionService.get_all_sections()]), 200
+    rows, _ = SectionService.get_section_rows(fields)
+    return jsonify(rows_to_dicts(fields, rows)), 200
+
+@main.route("/sections/batch-get", methods=["POST"])
+@swag_from(
+    batch_get_spec(
+        SECTION_FIELDS,
+        "Sections",
+        {
+            "items": [{"section_id": 2, "section_name": "Food and Beverages"}],
+            "missing": [7],
+        },
+    )
+)
+def batch_get_sections():
+    """
+    Get several sections by ID in one request.
+    """
+    controller_logger.info("Batch fetching sections")
+    return batch_get_response(SectionService.get_sections_by_ids, SECTION_FIELDS)
 
 @main.route("/sections/<int:section_id>", methods=["GET"])
 @swag_from(
@@ -81,7 +398,7 @@ def get_section(section_id):
     """
     Get a section by its ID.
     """
-    controller_logger.info(f"Fetching section with ID {section_id}")
+    controller_logger.info("Fetching section with ID %s", section_id)
     try:
         section = SectionService.get_section_by_id(section_id)
         return jsonify(section.to_dict()), 200
@@ -112,9 +429,9 @@ def add_section():
     """
     data = request.get_json()
     try:
-        validate(instance=data, schema=section_schema)
+        validate_section(data)
         section = SectionService.create_section(data["section_name"])
-        controller_logger.info(f"Created new section with name {data['section_name']}")
+        controller_logger.info("Created new section with name %s", data['section_name'])
         return jsonify(section.to_dict()), 201
     except ValidationError as e:
         return handle_exception(f"Invalid data: {e.message}", 400)
@@ -153,9 +470,9 @@ def update_section(section_id):
     """
     data = request.get_json()
     try:
-        validate(instance=data, schema=section_schema)
+        validate_section(data)
         section = SectionService.update_section(section_id, data["section_name"])
-        controller_logger.info(f"Updated section with ID {section_id}")
+        controller_logger.info("Updated section with ID %s", section_id)
         return jsonify(section.to_dict())
     except ValidationError as e:
         return handle_exception(f"Invalid data: {e.message}", 400)
@@ -164,6 +481,49 @@ def update_section(section_id):
     except SectionAlreadyExistsException as e:
         return handle_exception(e, 400)
 
+@main.route("/sections/<int:section_id>", methods=["PATCH"])
+@swag_from(
+    {
+        "parameters": [
+            {
+                "name": "section_id",
+                "in": "path",
+                "type": "integer",
+                "required": True,
+                "description": "ID of the section to update",
+            },
+            {
+                "name": "body",
+                "in": "body",
+                "required": True,
+                "schema": section_patch_schema,
+                "description": "Fields to change",
+            },
+        ],
+        "responses": {
+            "200": {"description": "Section updated"},
+            "400": {"description": "Invalid data or section already exists"},
+            "404": {"description": "Section not found"},
+        },
+    }
+)
+def patch_section(section_id):
+    """
+    Partially update a section.
+    """
+    data = request.get_json()
+    try:
+        validate_section_patch(data)
+        section = SectionService.patch_section(section_id, data)
+        controller_logger.info("Patched section with ID %s", section_id)
+        return jsonify(section.to_dict()), 200
+    except ValidationError as e:
+        return handle_exception(f"Invalid data: {e.message}", 400)
+    except SectionNotFoundException as e:
+        return handle_exception(e, 404)
+    except SectionAlreadyExistsException as e:
+        return handle_exception(e, 400)
+
 @main.route("/sections/<int:section_id>", methods=["DELETE"])
 @swag_from(
     {
@@ -174,32 +534,116 @@ def update_section(section_id):
                 "type": "integer",
                 "required": True,
                 "description": "ID of the section to delete",
-            }
+            },
+            chunk_size_parameter,
         ],
         "responses": {
-            "200": {"description": "Section deleted"},
+            "200": {"description": "Section and its products deleted"},
+            "400": {"description": "Invalid chunk_size"},
             "404": {"description": "Section not found"},
         },
     }
 )
 def delete_section(section_id):
     """
-    Delete a section.
+    Delete a section and all of its products.
     """
     try:
-        section = SectionService.delete_section(section_id)
-        controller_logger.info(f"Deleted section with ID {section_id}")
+        chunk_size = parse_chunk_size(request.args)
+        section = SectionService.delete_section(section_id, chunk_size)
+        controller_logger.info("Deleted section with ID %s", section_id)
         return jsonify(section.to_dict()), 200
+    except InvalidFilterException as e:
+        return handle_exception(e, 400)
     except SectionNotFoundException as e:
         return handle_exception(e, 404)
 
-@main.route("/products", methods=["GET"])
+section_summary_example = {
+    "section_id": 1,
+    "section_name": "Electronics",
+    "product_count": 2,
+    "total_units": 250,
+    "inventory_value": 150000.0,
+    "available_count": 2,
+    "unavailable_count": 0,
+}
+
+
+@main.route("/sections/<int:section_id>/summary", methods=["GET"])
+@swag_from(
+    {
+        "parameters": [
+            {
+                "name": "section_id",
+                "in": "path",
+                "type": "integer",
+                "required": True,
+                "description": "ID of the section to summarize",
+            }
+        ],
+        "responses": {
+            "200": {
+                "description": "Stock totals of a section",
+                "examples": {"application/json": section_summary_example},
+            },
+            "304": {"description": "Not modified since the ETag in If-None-Match"},
+            "404": {"description": "Section not found"},
+        },
+    }
+)
+@etag_from_versions("products", "sections")
+def get_section_summary(section_id):
+    """
+    Get product count, units in stock and stock value of a section.
+    """
+    controller_logger.info("Fetching summary of section with ID %s", section_id)
+    try:
+        return jsonify(SectionService.get_section_summary(section_id)), 200
+    except SectionNotFoundException as e:
+        return handle_exception(e, 404)
+
+@main.route("/inventory/summary", methods=["GET"])
 @swag_from(
     {
         "parameters": [],
         "responses": {
             "200": {
-                "description": "List of all products",
+                "description": "Stock totals per section and for the whole warehouse",
+                "examples": {
+                    "application/json": {
+                        "sections": [section_summary_example],
+                        "totals": {
+                            "section_count": 1,
+                            "product_count": 2,
+                            "total_units": 250,
+                            "inventory_value": 150000.0,
+                            "available_count": 2,
+                            "unavailable_count": 0,
+                        },
+                    }
+                },
+            },
+            "304": {"description": "Not modified since the ETag in If-None-Match"},
+        },
+    }
+)
+@etag_from_versions("products", "sections")
+def get_inventory_summary():
+    """
+    Get stock totals for every section and for the whole warehouse.
+    """
+    controller_logger.info("Fetching inventory summary")
+    return jsonify(SectionService.get_inventory_summary()), 200
+
+@main.route("/products", methods=["GET"])
+@swag_from(
+    {
+        "parameters": page_parameters
+        + product_filter_parameters
+        + [fields_parameter(PRODUCT_FIELDS)],
+        "responses": {
+            "200": {
+                "description": "List of products, paginated when limit or cursor is given",
                 "examples": {
                     "application/json": [
                         {
@@ -220,17 +664,141 @@ def delete_section(section_id):
                         },
                     ]
                 },
-            }
+            },
+            "304": {"description": "Not modified since the ETag in If-None-Match"},
+            "400": {"description": "Invalid limit, cursor, filter, sort or fields"},
         },
     }
 )
+@etag_from_versions("products", "sections")
 def get_products():
     """
     Get all products.
     """
-    controller_logger.info(f"Fetching all products from IP: {request.remote_addr}")
-    products = ProductService.get_all_products()
-    return jsonify([product.to_dict() for product in ProductService.get_all_products()]), 200
+    try:
+        page = parse_page_args(request.args)
+        filters = parse_product_filters(request.args)
+        sort = parse_product_sort(request.args)
+        fields = parse_fields(request.args, PRODUCT_FIELDS)
+        if page is not None:
+            limit, after = page
+            rows, next_position = ProductService.get_product_rows_page(
+                fields, limit, after, filters, sort
+            )
+            return paged_response(
+                rows_to_dicts(fields, rows), next_position, "main.get_products", limit
+            )
+    except (InvalidPaginationException, InvalidFilterException) as e:
+        return handle_exception(e, 400)
+
+    controller_logger.info("Fetching all products from IP: %s", request.remote_addr)
+    rows = ProductService.get_product_rows(fields, filters, sort)
+    return jsonify(rows_to_dicts(fields, rows)), 200
+
+@main.route("/products/batch-get", methods=["POST"])
+@swag_from(
+    batch_get_spec(
+        PRODUCT_FIELDS,
+        "Products",
+        {
+            "items": [
+                {"product_id": 3, "product_name": "Laptop"},
+                {"product_id": 1, "product_name": "Apple"},
+            ],
+            "missing": [42],
+        },
+    )
+)
+def batch_get_products():
+    """
+    Get several products by ID in one request.
+    """
+    controller_logger.info("Batch fetching products")
+    return batch_get_response(ProductService.get_products_by_ids, PRODUCT_FIELDS)
+
+EXPORT_FORMATS = ("ndjson",)
+
+
+@main.route("/products/export", methods=["GET"])
+@swag_from(
+    {
+        "parameters": [
+            {
+                "name": "format",
+                "in": "query",
+                "type": "string",
+                "required": False,
+                "enum": list(EXPORT_FORMATS),
+                "default": "ndjson",
+                "description": "Export format",
+            }
+        ],
+        "produces": ["application/x-ndjson"],
+        "responses": {
+            "200": {"description": "Stream of products, one JSON object per line"},
+            "400": {"description": "Unsupported export format"},
+        },
+    }
+)
+def export_products():
+    """
+    Stream every product as newline-delimited JSON.
+    """
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        return handle_exception(f"Unsupported export format {export_format}", 400)
+
+    controller_logger.info("Exporting all products as %s", export_format)
+
+    def generate():
+        for product in ProductService.iter_all_products():
+            yield json.dumps(product.to_dict()) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+SEARCH_PAGE_LIMIT = 20
+
+
+@main.route("/products/search", methods=["GET"])
+@swag_from(
+    {
+        "parameters": [
+            {
+                "name": "q",
+                "in": "query",
+                "type": "string",
+                "required": True,
+                "description": "Words to look for in product and section names; "
+                "each word matches as a prefix",
+            }
+        ]
+        + page_parameters,
+        "responses": {
+            "200": {
+                "description": "Matching products, best matches first. A Link "
+                'header with rel="next" points at the next page.'
+            },
+            "400": {"description": "Missing query or invalid limit or cursor"},
+        },
+    }
+)
+@etag_from_versions("products", "sections")
+def search_products():
+    """
+    Full-text search over products.
+    """
+    try:
+        terms = parse_search_terms(request.args)
+        limit, after = parse_page_args(request.args) or (SEARCH_PAGE_LIMIT, None)
+        products, next_position = ProductService.search_products(terms, limit, after)
+    except (InvalidPaginationException, InvalidFilterException) as e:
+        return handle_exception(e, 400)
+    return paged_response(
+        [product.to_dict() for product in products],
+        next_position,
+        "main.search_products",
+        limit,
+    )
 
 @main.route("/products/<int:product_id>", methods=["GET"])
 @swag_from(
@@ -268,7 +836,7 @@ def get_product(product_id):
     """
     try:
         product = ProductService.get_product_by_id(product_id)
-        controller_logger.info(f"Fetched product with ID {product_id}")
+        controller_logger.info("Fetched product with ID %s", product_id)
         return jsonify(product.to_dict()), 200
     except ProductNotFoundException as e:
         return handle_exception(e, 404)
@@ -297,7 +865,7 @@ def add_product():
     """
     data = request.get_json()
     try:
-        validate(instance=data, schema=product_schema)
+        validate_product(data)
         product = ProductService.create_product(
             data["section_id"],
             data["product_name"],
@@ -305,13 +873,239 @@ def add_product():
             data["price_per_unit"],
             data["is_product_available"],
         )
-        controller_logger.info(f"Created new product with name {data['product_name']}")
+        controller_logger.info("Created new product with name %s", data['product_name'])
         return jsonify(product.to_dict()), 201
     except ValidationError as e:
         return handle_exception(f"Invalid data: {e.message}", 400)
     except (InvalidSectionException, ProductAlreadyExistsException) as e:
         return handle_exception(e, 400)
 
+MAX_BULK_SIZE = 1000
+
+
+@main.route("/products/bulk", methods=["POST"])
+@swag_from(
+    {
+        "parameters": [
+            {
+                "name": "upsert",
+                "in": "query",
+                "type": "boolean",
+                "required": False,
+                "default": False,
+                "description": "Update products that already exist instead of reporting an error",
+            },
+            {
+                "name": "body",
+                "in": "body",
+                "required": True,
+                "schema": {"type": "array", "items": product_schema},
+                "description": f"Up to {MAX_BULK_SIZE} products",
+            },
+        ],
+        "responses": {
+            "200": {
+                "description": "Result for each product, in request order",
+                "examples": {
+                    "application/json": {
+                        "created": 1,
+                        "updated": 0,
+                        "failed": 1,
+                        "results": [
+                            {"index": 0, "status": "created", "product_id": 5},
+                            {
+                                "index": 1,
+                                "status": "error",
+                                "error": "Section with ID 9 does not exist",
+                            },
+                        ],
+                    }
+                },
+            },
+            "400": {"description": "Body is not an array or is too large"},
+        },
+    }
+)
+def bulk_add_products():
+    """
+    Create or upsert many products in one transaction.
+    """
+    data = request.get_json()
+    if not isinstance(data, list):
+        return handle_exception("Invalid data: expected an array of products", 400)
+    if len(data) > MAX_BULK_SIZE:
+        return handle_exception(
+            f"Invalid data: at most {MAX_BULK_SIZE} products per request", 400
+        )
+    upsert = request.args.get("upsert", "false").lower() in ("1", "true", "yes")
+
+    results = [None] * len(data)
+    valid_indexes, valid_items = [], []
+    for index, error in enumerate(validate_many(product_validator, data)):
+        if error is not None:
+            results[index] = {"status": "error", "error": f"Invalid data: {error}"}
+            continue
+        valid_indexes.append(index)
+        valid_items.append(data[index])
+
+    if valid_items:
+        try:
+            written = ProductService.bulk_create_products(valid_items, upsert=upsert)
+        except (InvalidSectionException, ProductAlreadyExistsException) as e:
+            return handle_exception(e, 400)
+        for index, result in zip(valid_indexes, written):
+            results[index] = result
+
+    counts = {"created": 0, "updated": 0, "error": 0}
+    for index, result in enumerate(results):
+        result["index"] = index
+        counts[result["status"]] += 1
+    controller_logger.info(
+        "Bulk product write: %s created, %s updated, %s failed",
+        counts["created"],
+        counts["updated"],
+        counts["error"],
+    )
+    return jsonify(
+        {
+            "created": counts["created"],
+            "updated": counts["updated"],
+            "failed": counts["error"],
+            "results": results,
+        }
+    ), 200
+
+@main.route("/products/<int:product_id>/stock", methods=["POST"])
+@swag_from(
+    {
+        "parameters": [
+            {
+                "name": "product_id",
+                "in": "path",
+                "type": "integer",
+                "required": True,
+                "description": "ID of the product whose stock moves",
+            },
+            {
+                "name": "body",
+                "in": "body",
+                "required": True,
+                "schema": stock_movement_schema,
+                "description": "Units to add, or a negative number of units to take out",
+            },
+        ],
+        "responses": {
+            "200": {
+                "description": "New stock level",
+                "examples": {
+                    "application/json": {
+                        "product_id": 1,
+                        "quantity_in_stock": 45,
+                        "is_product_available": True,
+                    }
+                },
+            },
+            "400": {"description": "Invalid data"},
+            "404": {"description": "Product not found"},
+            "409": {"description": "Not enough stock"},
+        },
+    }
+)
+def move_product_stock(product_id):
+    """
+    Move stock in or out of a product.
+    """
+    data = request.get_json()
+    try:
+        validate_stock_movement(data)
+        stock = ProductService.move_stock(product_id, data["delta"])
+        return jsonify(stock), 200
+    except ValidationError as e:
+        return handle_exception(f"Invalid data: {e.message}", 400)
+    except ProductNotFoundException as e:
+        return handle_exception(e, 404)
+    except InsufficientStockException as e:
+        return handle_exception(e, 409)
+
+
+@main.route("/stock/movements", methods=["POST"])
+@swag_from(
+    {
+        "parameters": [
+            {
+                "name": "body",
+                "in": "body",
+                "required": True,
+                "schema": {"type": "array", "items": batch_stock_movement_schema},
+                "description": f"Up to {MAX_BULK_SIZE} movements, applied in order",
+            }
+        ],
+        "responses": {
+            "200": {
+                "description": "Result for each movement, in request order",
+                "examples": {
+                    "application/json": {
+                        "applied": 1,
+                        "failed": 1,
+                        "results": [
+                            {
+                                "index": 0,
+                                "status": "applied",
+                                "product_id": 1,
+                                "quantity_in_stock": 45,
+                                "is_product_available": True,
+                            },
+                            {
+                                "index": 1,
+                                "status": "error",
+                                "product_id": 2,
+                                "error": "Not enough stock of product ID 2 to apply -500",
+                            },
+                        ],
+                    }
+                },
+            },
+            "400": {"description": "Body is not an array or is too large"},
+        },
+    }
+)
+def move_stock_batch():
+    """
+    Apply many stock movements in one transaction.
+    """
+    data = request.get_json()
+    if not isinstance(data, list):
+        return handle_exception("Invalid data: expected an array of movements", 400)
+    if len(data) > MAX_BULK_SIZE:
+        return handle_exception(
+            f"Invalid data: at most {MAX_BULK_SIZE} movements per request", 400
+        )
+
+    results = [None] * len(data)
+    valid_indexes, valid_movements = [], []
+    for index, error in enumerate(validate_many(batch_stock_movement_validator, data)):
+        if error is not None:
+            results[index] = {"status": "error", "error": f"Invalid data: {error}"}
+            continue
+        valid_indexes.append(index)
+        valid_movements.append(data[index])
+
+    if valid_movements:
+        applied = ProductService.move_stock_batch(valid_movements)
+        for index, result in zip(valid_indexes, applied):
+            results[index] = result
+
+    failed = 0
+    for index, result in enumerate(results):
+        result["index"] = index
+        failed += result["status"] == "error"
+    controller_logger.info(
+        "Stock movements: %s applied, %s failed", len(results) - failed, failed
+    )
+    return jsonify(
+        {"applied": len(results) - failed, "failed": failed, "results": results}
+    ), 200
+
 @main.route("/products/<int:product_id>", methods=["PUT"])
 @swag_from(
     {
@@ -344,7 +1138,7 @@ def update_product(product_id):
     """
     data = request.get_json()
     try:
-        validate(instance=data, schema=product_schema)
+        validate_product(data)
         product = ProductService.update_product(
             product_id,
             data["section_id"],
@@ -353,7 +1147,7 @@ def update_product(product_id):
             data["price_per_unit"],
             data["is_product_available"],
         )
-        controller_logger.info(f"Updated product with ID {product_id}")
+        controller_logger.info("Updated product with ID %s", product_id)
         return jsonify(product.to_dict()), 200
     except ValidationError as e:
         return handle_exception(f"Invalid data: {e.message}", 400)
@@ -362,6 +1156,49 @@ def update_product(product_id):
     except ProductAlreadyExistsException as e:
         return handle_exception(e, 404)
 
+@main.route("/products/<int:product_id>", methods=["PATCH"])
+@swag_from(
+    {
+        "parameters": [
+            {
+                "name": "product_id",
+                "in": "path",
+                "type": "integer",
+                "required": True,
+                "description": "ID of the product to update",
+            },
+            {
+                "name": "body",
+                "in": "body",
+                "required": True,
+                "schema": product_patch_schema,
+                "description": "Fields to change, e.g. {\"price_per_unit\": 900}",
+            },
+        ],
+        "responses": {
+            "200": {"description": "Product updated"},
+            "400": {"description": "Invalid data, unknown section or duplicate name"},
+            "404": {"description": "Product not found"},
+        },
+    }
+)
+def patch_product(product_id):
+    """
+    Partially update a product.
+    """
+    data = request.get_json()
+    try:
+        validate_product_patch(data)
+        product = ProductService.patch_product(product_id, data)
+        controller_logger.info("Patched product with ID %s", product_id)
+        return jsonify(product.to_dict()), 200
+    except ValidationError as e:
+        return handle_exception(f"Invalid data: {e.message}", 400)
+    except ProductNotFoundException as e:
+        return handle_exception(e, 404)
+    except (InvalidSectionException, ProductAlreadyExistsException) as e:
+        return handle_exception(e, 400)
+
 @main.route("/products/<int:product_id>", methods=["DELETE"])
 @swag_from(
     {
@@ -386,7 +1223,144 @@ def delete_product(product_id):
     """
     try:
         product = ProductService.delete_product(product_id)
-        controller_logger.info(f"Deleted product with ID {product_id}")
+        controller_logger.info("Deleted product with ID %s", product_id)
         return jsonify(product.to_dict()), 200
     except ProductNotFoundException as e:
         return handle_exception(e, 404)
+
+@main.route("/products", methods=["DELETE"])
+@swag_from(
+    {
+        "parameters": [
+            parameter
+            for parameter in product_filter_parameters
+            if parameter["name"] != "sort"
+        ]
+        + [chunk_size_parameter],
+        "responses": {
+            "200": {
+                "description": "Number of products deleted",
+                "examples": {"application/json": {"deleted": 120}},
+            },
+            "400": {"description": "No filter given, or an invalid filter or chunk_size"},
+        },
+    }
+)
+def delete_products():
+    """
+    Delete every product matching the filters.
+    """
+    try:
+        filters = parse_product_filters(request.args)
+        chunk_size = parse_chunk_size(request.args)
+        if not filters:
+            raise InvalidFilterException("At least one filter is required to delete products")
+    except InvalidFilterException as e:
+        return handle_exception(e, 400)
+    deleted = ProductService.delete_products(filters, chunk_size)
+    controller_logger.info("Deleted %s products matching %s", deleted, filters)
+    return jsonify({"deleted": deleted}), 200
+
+
+@main.route("/changes", methods=["GET"])
+@swag_from(
+    {
+        "parameters": [
+            {
+                "name": "since",
+                "in": "query",
+                "type": "integer",
+                "required": False,
+                "default": 0,
+                "description": "Return changes after this sequence number, "
+                "the next_since of the previous response",
+            },
+            {
+                "name": "limit",
+                "in": "query",
+                "type": "integer",
+                "required": False,
+                "description": "Maximum number of changes to return (1-1000)",
+            },
+        ],
+        "responses": {
+            "200": {
+                "description": "Section and product changes in commit order. "
+                "Creates and updates carry the current row, deletes are tombstones",
+                "examples": {
+                    "application/json": {
+                        "changes": [
+                            {
+                                "seq": 41,
+                                "entity": "product",
+                                "id": 3,
+                                "op": "update",
+                                "changed_at": "2024-05-02T09:30:00",
+                                "data": {
+                                    "product_id": 3,
+                                    "section_id": 2,
+                                    "product_name": "Canned Beans",
+                                    "quantity_in_stock": 90,
+                                    "price_per_unit": 2,
+                                    "is_product_available": True,
+                                    "section": "Food and Drinks",
+                                },
+                            },
+                            {
+                                "seq": 42,
+                                "entity": "product",
+                                "id": 4,
+                                "op": "delete",
+                                "changed_at": "2024-05-02T09:31:00",
+                                "data": None,
+                            },
+                        ],
+                        "next_since": 42,
+                        "last_seq": 42,
+                        "has_more": False,
+                    }
+                },
+            },
+            "304": {"description": "Not modified since the ETag in If-None-Match"},
+            "400": {"description": "Invalid since or limit"},
+        },
+    }
+)
+@etag_from_versions("sections", "products")
+def get_changes():
+    """
+    Get the changes to sections and products after a sequence number.
+    """
+    try:
+        since, limit = parse_since_args(request.args)
+    except InvalidPaginationException as e:
+        return handle_exception(e, 400)
+    controller_logger.info("Fetching up to %s changes after seq %s", limit, since)
+    changes, has_more = ChangeService.get_changes(since, limit)
+    return jsonify({
+        "changes": changes,
+        "next_since": changes[-1]["seq"] if changes else since,
+        "last_seq": ChangeService.get_last_seq(),
+        "has_more": has_more,
+    }), 200
+
+
+@main.route("/cache/stats", methods=["GET"])
+@swag_from(
+    {
+        "parameters": [],
+        "responses": {
+            "200": {
+                "description": "Service cache counters",
+                "examples": {
+                    "application/json": {"hits": 120, "misses": 8, "size": 8}
+                },
+            }
+        },
+    }
+)
+def cache_stats():
+    """
+    Get service cache hit and miss counters.
+    """
+    return jsonify(service_cache.stats()), 200
@@ -0,0 +1,80 @@
+import os
+from sqlalchemy import event
+
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+}
+
+# Set on every SQLite connection whatever the profile: SQLite leaves
+# foreign keys, and so ON DELETE CASCADE, unenforced by default.
+SQLITE_REQUIRED_PRAGMAS = {"foreign_keys": "ON"}
+
+PROFILES = {
+    # SQLAlchemy defaults, kept for comparison in benchmarks.
+    "default": {"engine_options": {}, "sqlite_pragmas": {}},
+    "sqlite": {"engine_options": {}, "sqlite_pragmas": SQLITE_PRAGMAS},
+    "server": {
+        "engine_options": {
+            "pool_size": 10,
+            "max_overflow": 20,
+            "pool_timeout": 30,
+            "pool_recycle": 1800,
+            "pool_pre_ping": True,
+        },
+        "sqlite_pragmas": {},
+    },
+}
+
+
+def select_profile_name(database_uri):
+    """
+    WAREHOUSE_DB_PROFILE wins, otherwise pick by the database URI scheme.
+    """
+    name = os.environ.get("WAREHOUSE_DB_PROFILE")
+    if name:
+        return name
+    return "sqlite" if database_uri.startswith("sqlite") else "server"
+
+
+def get_profile(name):
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown database profile {name}, expected one of {', '.join(PROFILES)}"
+        )
+
+
+def apply_engine_options(app):
+    """
+    Merge the profile's engine options under any SQLALCHEMY_ENGINE_OPTIONS the
+    app already sets. Must run before db.init_app.
+    """
+    profile = get_profile(app.config["DATABASE_PROFILE"])
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        **profile["engine_options"],
+        **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+    }
+    return profile
+
+
+def install_sqlite_pragmas(engine, pragmas):
+    """
+    Run SQLITE_REQUIRED_PRAGMAS and the PRAGMA statements in `pragmas` on
+    every new DBAPI connection of `engine`.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = {**SQLITE_REQUIRED_PRAGMAS, **pragmas}
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
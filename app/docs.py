@@ -0,0 +1,82 @@
+import os
+from importlib.util import find_spec
+from flask import Blueprint, current_app, jsonify, redirect, render_template, url_for
+
+
+SWAGGER_TEMPLATE = {
+    "info": {
+        "title": "My Flask API",
+        "description": "An example API using Flask and Swagger",
+        "version": "1.0.0",
+    }
+}
+
+
+def swag_from(specs):
+    """
+    Attach an OpenAPI specs dict to a view, as flasgger's swag_from does,
+    without importing flasgger or wrapping the view.
+    """
+    def decorator(view):
+        view.specs_dict = specs
+        return view
+    return decorator
+
+
+def get_swagger():
+    """
+    The app's flasgger Swagger object, imported and set up on first use.
+    """
+    swagger = current_app.extensions.get("swagger")
+    if swagger is None:
+        from flasgger import Swagger
+
+        # No init_app: the routes are registered by init_docs, and the spec
+        # is built from the specs_dict attributes left by swag_from.
+        swagger = Swagger(template=SWAGGER_TEMPLATE)
+        swagger.app = current_app._get_current_object()
+        swagger.load_config(swagger.app)
+        current_app.extensions["swagger"] = swagger
+    return swagger
+
+
+def openapi_spec():
+    # flasgger caches the spec per endpoint outside debug mode.
+    return jsonify(get_swagger().get_apispecs("apispec_1"))
+
+
+def apidocs():
+    from flasgger.base import APIDocsView
+
+    view = APIDocsView.as_view("apidocs", view_args={"config": get_swagger().config})
+    return view()
+
+
+def oauth_redirect():
+    return render_template("flasgger/oauth2-redirect.html")
+
+
+def init_docs(app):
+    """
+    Register the /apidocs/ UI and /apispec_1.json under flasgger's usual
+    endpoint names. flasgger itself is only imported when one of them is
+    first requested. Does nothing when flasgger is not installed.
+    """
+    spec = find_spec("flasgger")
+    if spec is None:
+        return
+    package_dir = os.path.dirname(spec.origin)
+    docs = Blueprint(
+        "flasgger",
+        __name__,
+        template_folder=os.path.join(package_dir, "ui3", "templates"),
+        static_folder=os.path.join(package_dir, "ui3", "static"),
+        static_url_path="/flasgger_static",
+    )
+    docs.add_url_rule("/apispec_1.json", "apispec_1", openapi_spec)
+    docs.add_url_rule("/apidocs/", "apidocs", apidocs)
+    docs.add_url_rule(
+        "/apidocs/index.html", "apidocs_index", lambda: redirect(url_for("flasgger.apidocs"))
+    )
+    docs.add_url_rule("/oauth2-redirect.html", "oauth_redirect", oauth_redirect)
+    app.register_blueprint(docs)
@@ -24,3 +24,15 @@ class ProductAlreadyExistsException(ProductException):
 
 class InvalidSectionException(ProductException):
     pass
+
+
+class InvalidPaginationException(Exception):
+    pass
+
+
+class InvalidFilterException(Exception):
+    pass
+
+
+class InsufficientStockException(ProductException):
+    pass
@@ -0,0 +1,138 @@
+import re
+from .exceptions import InvalidFilterException
+from .models import INTEGER_MIN, INTEGER_MAX
+
+
+def parse_integer(value):
+    """
+    int() limited to the range of the integer columns, which is all the
+    database driver can bind.
+    """
+    number = int(value)
+    if not INTEGER_MIN <= number <= INTEGER_MAX:
+        raise ValueError(value)
+    return number
+
+
+def parse_bool(value):
+    lowered = value.lower()
+    if lowered in ("1", "true", "yes"):
+        return True
+    if lowered in ("0", "false", "no"):
+        return False
+    raise ValueError(value)
+
+
+# Query parameters accepted by GET /products, with the function each is
+# parsed with. Every filter is backed by an index on the products table.
+PRODUCT_FILTERS = {
+    "section_id": parse_integer,
+    "available": parse_bool,
+    "min_price": parse_integer,
+    "max_price": parse_integer,
+    "max_quantity": parse_integer,
+    "name_prefix": str,
+}
+
+# Columns GET /products can be sorted by; prefix with "-" for descending.
+PRODUCT_SORT_FIELDS = (
+    "product_id",
+    "product_name",
+    "price_per_unit",
+    "quantity_in_stock",
+)
+
+# Fields a ?fields= projection may name, in the order they are returned.
+PRODUCT_FIELDS = (
+    "product_id",
+    "section_id",
+    "product_name",
+    "quantity_in_stock",
+    "price_per_unit",
+    "is_product_available",
+    "section",
+)
+
+SECTION_FIELDS = ("section_id", "section_name")
+
+
+def parse_product_filters(args):
+    """
+    Read the whitelisted filters from the query string.
+    """
+    filters = {}
+    for name, parse in PRODUCT_FILTERS.items():
+        raw = args.get(name)
+        if raw is None:
+            continue
+        try:
+            filters[name] = parse(raw)
+        except ValueError:
+            raise InvalidFilterException(f"Invalid value {raw} for filter {name}")
+    if filters.get("name_prefix") == "":
+        del filters["name_prefix"]
+    return filters
+
+
+def parse_product_sort(args):
+    sort = args.get("sort", "product_id")
+    if sort.lstrip("-") not in PRODUCT_SORT_FIELDS:
+        raise InvalidFilterException(
+            f"Invalid sort {sort}, expected one of {', '.join(PRODUCT_SORT_FIELDS)}"
+        )
+    return sort
+
+
+# Largest chunk_size a chunked delete accepts. Each chunk is deleted by ID
+# list, so this stays under SQLite's default limit of 999 bound parameters.
+MAX_DELETE_CHUNK_SIZE = 500
+
+
+def parse_chunk_size(args):
+    """
+    Read `chunk_size` from the query string, or None to delete in one
+    transaction.
+    """
+    raw = args.get("chunk_size")
+    if raw is None:
+        return None
+    try:
+        chunk_size = int(raw)
+    except ValueError:
+        chunk_size = 0
+    if not 1 <= chunk_size <= MAX_DELETE_CHUNK_SIZE:
+        raise InvalidFilterException(
+            f"Invalid chunk_size {raw}, expected 1 to {MAX_DELETE_CHUNK_SIZE}"
+        )
+    return chunk_size
+
+
+def parse_fields(args, allowed):
+    """
+    Read the comma-separated `fields` parameter. Returns the requested
+    fields in the order of `allowed`, or all of them when it is absent.
+    """
+    raw = args.get("fields")
+    if raw is None:
+        return allowed
+    requested = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = requested.difference(allowed)
+    if not requested or unknown:
+        raise InvalidFilterException(
+            f"Invalid fields {raw}, expected some of {', '.join(allowed)}"
+        )
+    return tuple(field for field in allowed if field in requested)
+
+
+SEARCH_TERM_PATTERN = re.compile(r"\w+")
+
+
+def parse_search_terms(args):
+    """
+    Split the `q` parameter into the words it contains. Punctuation is
+    dropped, so user input never reaches the FTS5 query syntax.
+    """
+    terms = SEARCH_TERM_PATTERN.findall(args.get("q", ""))
+    if not terms:
+        raise InvalidFilterException("Query parameter q must contain at least one word")
+    return terms
@@ -0,0 +1,132 @@
+import functools
+import logging
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+
+perf_logger = logging.getLogger('perf_logger')
+
+# Process-wide switch, set by init_instrumentation. While it is off the
+# decorators and request hooks below return immediately.
+enabled = False
+
+
+def timed_phase(phase):
+    """
+    Add the time spent in the wrapped function to `phase` for the current
+    request. Nested calls within the same phase are only counted once.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled or not has_request_context() or "phase_timings" not in g:
+                return function(*args, **kwargs)
+            if phase in g.active_phases:
+                return function(*args, **kwargs)
+            g.active_phases.add(phase)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                g.active_phases.discard(phase)
+                g.phase_timings[phase] = (
+                    g.phase_timings.get(phase, 0.0) + time.perf_counter() - started
+                )
+        return wrapper
+    return decorator
+
+
+def timed_methods(phase):
+    """
+    Class decorator applying timed_phase to every staticmethod.
+    """
+    def decorator(cls):
+        for name, value in list(vars(cls).items()):
+            if isinstance(value, staticmethod):
+                setattr(cls, name, staticmethod(timed_phase(phase)(value.__func__)))
+        return cls
+    return decorator
+
+
+# The start time is kept on the execution context, which is discarded with
+# the statement. A statement that raises never reaches after_cursor_execute,
+# so anything stored on the pooled connection would be left behind.
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context._query_started
+    if not has_request_context() or "phase_timings" not in g:
+        return
+    g.query_count += 1
+    g.query_time += duration
+    if duration * 1000 >= g.slow_query_ms:
+        perf_logger.warning(
+            "Slow query (%.1f ms) during %s %s: %s",
+            duration * 1000,
+            request.method,
+            request.path,
+            statement,
+        )
+
+
+def init_instrumentation(app, engine):
+    """
+    Turn instrumentation on when INSTRUMENTATION_ENABLED is set and hook
+    the SQL timing events on `engine`.
+    """
+    global enabled
+    if not app.config.get("INSTRUMENTATION_ENABLED"):
+        return
+    enabled = True
+    app.config.setdefault("SLOW_REQUEST_MS", 500)
+    app.config.setdefault("SLOW_QUERY_MS", 100)
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+def start_request_timing(config):
+    if not enabled:
+        return
+    g.request_started = time.perf_counter()
+    g.phase_timings = {}
+    g.active_phases = set()
+    g.query_count = 0
+    g.query_time = 0.0
+    g.slow_query_ms = config["SLOW_QUERY_MS"]
+
+
+def finish_request_timing(response, config):
+    """
+    Add a Server-Timing header and log the request if it was slow.
+    Serialization is the view time not spent validating or in services.
+    """
+    if not enabled or "phase_timings" not in g:
+        return response
+    total = time.perf_counter() - g.request_started
+    validation = g.phase_timings.get("validation", 0.0)
+    service = g.phase_timings.get("service", 0.0)
+    serialization = max(total - validation - service, 0.0)
+    response.headers["Server-Timing"] = ", ".join([
+        f'db;dur={g.query_time * 1000:.2f};desc="{g.query_count} queries"',
+        f"validation;dur={validation * 1000:.2f}",
+        f"service;dur={service * 1000:.2f}",
+        f"serialization;dur={serialization * 1000:.2f}",
+        f"total;dur={total * 1000:.2f}",
+    ])
+    if total * 1000 >= config["SLOW_REQUEST_MS"]:
+        perf_logger.warning(
+            "Slow request %s %s: %.1f ms total, %s queries in %.1f ms, "
+            "validation %.1f ms, service %.1f ms, serialization %.1f ms",
+            request.method,
+            request.full_path,
+            total * 1000,
+            g.query_count,
+            g.query_time * 1000,
+            validation * 1000,
+            service * 1000,
+            serialization * 1000,
+        )
+    return response
@@ -1,8 +1,20 @@
+import secrets
+from sqlalchemy import DDL, event, func
 from . import db
 
 
+# Range of the integer columns. The driver raises OverflowError when asked to
+# bind a Python int outside it, so values taken from requests are checked
+# against it first.
+INTEGER_MIN = -2**63
+INTEGER_MAX = 2**63 - 1
+
+
 class Section(db.Model):
     __tablename__ = "sections"
+    __table_args__ = (
+        db.Index("ux_sections_section_name", "section_name", unique=True),
+    )
 
     section_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     section_name = db.Column(db.String(80), nullable=False)
@@ -16,17 +28,40 @@ class Section(db.Model):
 
 class Product(db.Model):
     __tablename__ = "products"
+    __table_args__ = (
+        db.Index(
+            "ux_products_section_id_product_name",
+            "section_id",
+            "product_name",
+            unique=True,
+        ),
+        # Filter and sort indexes for GET /products. The trailing product_id
+        # keeps keyset pagination on these orderings an index range scan.
+        db.Index("ix_products_section_id", "section_id", "product_id"),
+        db.Index("ix_products_product_name", "product_name", "product_id"),
+        db.Index("ix_products_price_per_unit", "price_per_unit", "product_id"),
+        db.Index("ix_products_quantity_in_stock", "quantity_in_stock", "product_id"),
+        db.Index(
+            "ix_products_is_product_available", "is_product_available", "product_id"
+        ),
+    )
 
     product_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     section_id = db.Column(
-        db.Integer, db.ForeignKey("sections.section_id"), nullable=False
+        db.Integer,
+        db.ForeignKey("sections.section_id", ondelete="CASCADE"),
+        nullable=False,
     )
     product_name = db.Column(db.String(80), nullable=False)
     quantity_in_stock = db.Column(db.Integer, nullable=False)
     price_per_unit = db.Column(db.Float, nullable=False)
     is_product_available = db.Column(db.Boolean, default=True)
 
-    section = db.relationship("Section", backref=db.backref("products", lazy=True))
+    # The database deletes a section's products, the ORM never loads them
+    # just to remove them.
+    section = db.relationship(
+        "Section", backref=db.backref("products", lazy=True, passive_deletes=True)
+    )
 
     def to_dict(self):
         return {
@@ -38,3 +73,173 @@ class Product(db.Model):
             "is_product_available": self.is_product_available,
             "section": self.section.section_name,
         }
+
+
+class TableVersion(db.Model):
+    """
+    Change counter per table, bumped by every service write in the same
+    transaction. Read endpoints derive their ETags from it.
+
+    The DATABASE_EPOCH row holds a random number picked when the table is
+    created. It is part of every ETag, so a rebuilt database whose counters
+    start over never answers 304 to a tag issued for the old data.
+    """
+
+    __tablename__ = "table_versions"
+
+    table_name = db.Column(db.String(80), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+DATABASE_EPOCH = "epoch"
+
+
+def new_database_epoch():
+    # Non-zero and within a 32-bit INTEGER on every backend.
+    return secrets.randbelow(2**31 - 1) + 1
+
+
+@event.listens_for(TableVersion.__table__, "after_create")
+def seed_table_versions(target, connection, **kw):
+    connection.execute(
+        target.insert(),
+        [
+            {"table_name": DATABASE_EPOCH, "version": new_database_epoch()},
+            {"table_name": "sections", "version": 0},
+            {"table_name": "products", "version": 0},
+        ],
+    )
+
+
+class Change(db.Model):
+    """
+    Append-only log of section and product writes for GET /changes. The
+    services add entries in the same transaction as the write. Only on
+    SQLite, which runs one write transaction at a time, does seq follow
+    commit order; on a database with concurrent writers a lower seq can
+    commit after a higher one. AUTOINCREMENT keeps seq from being reused
+    after compaction deletes the newest entries.
+    """
+
+    __tablename__ = "changes"
+    __table_args__ = (
+        # Finds the later changes to the same row during compaction.
+        db.Index("ix_changes_entity_entity_id", "entity", "entity_id", "seq"),
+        {"sqlite_autoincrement": True},
+    )
+
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    entity = db.Column(db.String(16), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(8), nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False, server_default=func.now())
+
+
+# Full-text index over product and section names for GET /products/search.
+# SQLite only: triggers keep it in step with every write, including bulk
+# Core statements, and rebuild_search_index.py repopulates it.
+PRODUCT_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+    "product_name, section_name, tokenize='unicode61', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN "
+    "INSERT INTO products_fts (rowid, product_name, section_name) "
+    "SELECT new.product_id, new.product_name, section_name FROM sections "
+    "WHERE section_id = new.section_id; END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_update "
+    "AFTER UPDATE OF product_name, section_id ON products BEGIN "
+    "DELETE FROM products_fts WHERE rowid = old.product_id; "
+    "INSERT INTO products_fts (rowid, product_name, section_name) "
+    "SELECT new.product_id, new.product_name, section_name FROM sections "
+    "WHERE section_id = new.section_id; END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN "
+    "DELETE FROM products_fts WHERE rowid = old.product_id; END",
+    "CREATE TRIGGER IF NOT EXISTS sections_fts_rename "
+    "AFTER UPDATE OF section_name ON sections BEGIN "
+    "UPDATE products_fts SET section_name = new.section_name WHERE rowid IN "
+    "(SELECT product_id FROM products WHERE section_id = new.section_id); END",
+]
+
+for statement in PRODUCT_SEARCH_DDL:
+    event.listen(
+        Product.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite")
+    )
+event.listen(
+    Product.__table__,
+    "after_drop",
+    DDL("DROP TABLE IF EXISTS products_fts").execute_if(dialect="sqlite"),
+)
+
+
+class SectionStats(db.Model):
+    """
+    Inventory counters of one section, read by the section and inventory
+    summaries instead of aggregating products. SQLite only: the triggers in
+    SECTION_STATS_DDL keep them in step with every write, including bulk
+    Core statements and cascaded deletes, and check_section_stats.py
+    repairs any drift.
+    """
+
+    __tablename__ = "section_stats"
+
+    section_id = db.Column(
+        db.Integer,
+        db.ForeignKey("sections.section_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    product_count = db.Column(db.Integer, nullable=False, server_default="0")
+    total_units = db.Column(db.Integer, nullable=False, server_default="0")
+    inventory_value = db.Column(db.Float, nullable=False, server_default="0")
+    available_count = db.Column(db.Integer, nullable=False, server_default="0")
+
+
+def section_stats_delta(sign, row):
+    """
+    SET clause adding (sign "+") or removing (sign "-") the product `row`
+    ("new" or "old") from its section's counters.
+    """
+    return (
+        f"product_count = product_count {sign} 1, "
+        f"total_units = total_units {sign} {row}.quantity_in_stock, "
+        f"inventory_value = inventory_value {sign} "
+        f"{row}.quantity_in_stock * {row}.price_per_unit, "
+        f"available_count = available_count {sign} ({row}.is_product_available IS 1)"
+    )
+
+
+# The product triggers need both tables, so they run once create_all has
+# created every table.
+SECTION_STATS_DDL = [
+    "CREATE TRIGGER IF NOT EXISTS section_stats_section_insert "
+    "AFTER INSERT ON sections BEGIN "
+    "INSERT INTO section_stats (section_id) VALUES (new.section_id); END",
+    "CREATE TRIGGER IF NOT EXISTS section_stats_product_insert "
+    "AFTER INSERT ON products BEGIN "
+    f"UPDATE section_stats SET {section_stats_delta('+', 'new')} "
+    "WHERE section_id = new.section_id; END",
+    "CREATE TRIGGER IF NOT EXISTS section_stats_product_delete "
+    "AFTER DELETE ON products BEGIN "
+    f"UPDATE section_stats SET {section_stats_delta('-', 'old')} "
+    "WHERE section_id = old.section_id; END",
+    # Stock moves and edits within a section touch one counter row.
+    "CREATE TRIGGER IF NOT EXISTS section_stats_product_update "
+    "AFTER UPDATE OF quantity_in_stock, price_per_unit, is_product_available "
+    "ON products WHEN old.section_id = new.section_id BEGIN "
+    "UPDATE section_stats SET "
+    "total_units = total_units + new.quantity_in_stock - old.quantity_in_stock, "
+    "inventory_value = inventory_value "
+    "+ new.quantity_in_stock * new.price_per_unit "
+    "- old.quantity_in_stock * old.price_per_unit, "
+    "available_count = available_count "
+    "+ (new.is_product_available IS 1) - (old.is_product_available IS 1) "
+    "WHERE section_id = new.section_id; END",
+    "CREATE TRIGGER IF NOT EXISTS section_stats_product_move "
+    "AFTER UPDATE OF section_id ON products "
+    "WHEN old.section_id <> new.section_id BEGIN "
+    f"UPDATE section_stats SET {section_stats_delta('-', 'old')} "
+    "WHERE section_id = old.section_id; "
+    f"UPDATE section_stats SET {section_stats_delta('+', 'new')} "
+    "WHERE section_id = new.section_id; END",
+]
+
+for statement in SECTION_STATS_DDL:
+    event.listen(db.metadata, "after_create", DDL(statement).execute_if(dialect="sqlite"))
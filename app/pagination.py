@@ -0,0 +1,125 @@
+import base64
+import binascii
+import json
+import math
+from .exceptions import InvalidPaginationException
+from .models import INTEGER_MIN, INTEGER_MAX
+
+
+MAX_PAGE_LIMIT = 1000
+
+
+def encode_cursor(position):
+    """
+    Encode the position of the last item on a page: its ID, or a
+    [sort value, ID] pair when the list is sorted by another column.
+    """
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        return json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidPaginationException(f"Invalid cursor {cursor}")
+
+
+def is_integer(value):
+    """
+    True for an int (not a bool) that fits the integer columns.
+    """
+    return type(value) is int and INTEGER_MIN <= value <= INTEGER_MAX
+
+
+def check_id_cursor(after_id):
+    if after_id is not None and not is_integer(after_id):
+        raise InvalidPaginationException("Invalid cursor for this list")
+    return after_id
+
+
+def is_sort_value(value, value_type, nullable=False):
+    """
+    True when `value` can be compared with a column holding `value_type`
+    without relying on SQLite's cross-type ordering.
+    """
+    if value is None:
+        return nullable
+    if value_type is str:
+        return type(value) is str
+    if value_type is int:
+        return is_integer(value)
+    if value_type is float:
+        return is_integer(value) or (type(value) is float and math.isfinite(value))
+    return False
+
+
+def check_sort_cursor(after, value_type, nullable=False):
+    """
+    Validate a [sort value, ID] cursor for a column holding `value_type`.
+    """
+    if after is None:
+        return None
+    if (
+        not isinstance(after, list)
+        or len(after) != 2
+        or not is_integer(after[1])
+        or not is_sort_value(after[0], value_type, nullable)
+    ):
+        raise InvalidPaginationException("Invalid cursor for this sort order")
+    return after
+
+
+def check_search_cursor(after):
+    """
+    Validate a [rank, ID] cursor of a search. The rank is a float.
+    """
+    try:
+        return check_sort_cursor(after, float)
+    except InvalidPaginationException:
+        raise InvalidPaginationException("Invalid cursor for this search")
+
+
+def parse_page_args(args):
+    """
+    Read `limit` and `cursor` from the query string.
+
+    Returns (limit, after), where `after` is the decoded cursor position, or
+    None when the client did not ask for a page.
+    """
+    raw_limit = args.get("limit")
+    cursor = args.get("cursor")
+    if raw_limit is None and cursor is None:
+        return None
+
+    limit = MAX_PAGE_LIMIT
+    if raw_limit is not None:
+        try:
+            limit = int(raw_limit)
+        except ValueError:
+            raise InvalidPaginationException(f"Invalid limit {raw_limit}")
+        if not 1 <= limit <= MAX_PAGE_LIMIT:
+            raise InvalidPaginationException(
+                f"Limit must be between 1 and {MAX_PAGE_LIMIT}"
+            )
+
+    after = decode_cursor(cursor) if cursor else None
+    return limit, after
+
+
+def parse_since_args(args):
+    """
+    Read `since` and `limit` for GET /changes. Returns (since, limit), with
+    since 0 and limit MAX_PAGE_LIMIT when they are absent.
+    """
+    raw_since = args.get("since", "0")
+    raw_limit = args.get("limit", str(MAX_PAGE_LIMIT))
+    try:
+        since, limit = int(raw_since), int(raw_limit)
+    except ValueError:
+        raise InvalidPaginationException(f"Invalid since {raw_since} or limit {raw_limit}")
+    if not 0 <= since <= INTEGER_MAX:
+        raise InvalidPaginationException(f"since must be between 0 and {INTEGER_MAX}")
+    if not 1 <= limit <= MAX_PAGE_LIMIT:
+        raise InvalidPaginationException(f"Limit must be between 1 and {MAX_PAGE_LIMIT}")
+    return since, limit
@@ -1,3 +1,14 @@
+from .models import INTEGER_MAX
+
+# Largest stock level and stock movement, in either direction. Both stay
+# within half the integer column range, so quantity_in_stock + delta cannot
+# overflow.
+MAX_QUANTITY = INTEGER_MAX // 2
+
+quantity_schema = {"type": "integer", "minimum": -MAX_QUANTITY, "maximum": MAX_QUANTITY}
+
+delta_schema = {**quantity_schema, "not": {"const": 0}}
+
 section_schema = {
     "type": "object",
     "properties": {
@@ -11,7 +22,7 @@ product_schema = {
     "properties": {
         "section_id": {"type": "integer"},
         "product_name": {"type": "string"},
-        "quantity_in_stock": {"type": "integer"},
+        "quantity_in_stock": quantity_schema,
         "price_per_unit": {"type": "integer"},
         "is_product_available": {"type": "boolean"},
     },
@@ -22,4 +33,49 @@ product_schema = {
         "price_per_unit",
         "is_product_available",
     ],
-}
\ No newline at end of file
+}
+stock_movement_schema = {
+    "type": "object",
+    "properties": {
+        "delta": delta_schema,
+    },
+    "required": ["delta"],
+}
+
+batch_stock_movement_schema = {
+    "type": "object",
+    "properties": {
+        "product_id": {"type": "integer", "minimum": 1, "maximum": INTEGER_MAX},
+        "delta": delta_schema,
+    },
+    "required": ["product_id", "delta"],
+}
+
+batch_get_schema = {
+    "type": "object",
+    "properties": {
+        "ids": {
+            "type": "array",
+            "items": {"type": "integer", "minimum": 1, "maximum": INTEGER_MAX},
+            "minItems": 1,
+            "maxItems": 1000,
+        },
+    },
+    "required": ["ids"],
+    "additionalProperties": False,
+}
+
+# PATCH bodies: any non-empty subset of the fields above, and nothing else.
+section_patch_schema = {
+    "type": "object",
+    "properties": section_schema["properties"],
+    "minProperties": 1,
+    "additionalProperties": False,
+}
+
+product_patch_schema = {
+    "type": "object",
+    "properties": product_schema["properties"],
+    "minProperties": 1,
+    "additionalProperties": False,
+}
@@ -1,91 +1,972 @@
 import logging
-from .models import db, Section, Product
+import math
+import time
+from sqlalchemy import (
+    and_,
+    bindparam,
+    case,
+    column,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    literal_column,
+    or_,
+    select,
+    table,
+    tuple_,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from .cache import CachedRecord, LRUCache, ReadThroughCache
+from .instrumentation import timed_methods
+from .filtering import PRODUCT_FIELDS, SECTION_FIELDS
+from .models import db, Change, Section, SectionStats, Product, TableVersion
+from .pagination import check_id_cursor, check_search_cursor, check_sort_cursor
 from .exceptions import (
     SectionNotFoundException,
     SectionAlreadyExistsException,
     ProductNotFoundException,
     ProductAlreadyExistsException,
     InvalidSectionException,
+    InsufficientStockException,
 )
 
 
 service_logger = logging.getLogger('service_logger')
 
+
+service_cache = ReadThroughCache(LRUCache())
+
+
+def configure_cache(backend):
+    """
+    Swap the cache backend, e.g. for a shared cache used by several workers.
+    """
+    service_cache.backend = backend
+    service_cache.clear()
+
+
+def section_cache_key(section_id):
+    return f"section:{section_id}"
+
+
+def product_cache_key(product_id):
+    return f"product:{product_id}"
+
+
+def prefix_upper_bound(prefix):
+    """
+    Smallest string greater than every string starting with `prefix`, so a
+    prefix match can be written as an index-friendly range. A trailing
+    U+10FFFF has no successor and carries into the character before it;
+    None means there is no upper bound. The surrogates U+D800-U+DFFF cannot
+    be encoded, so the successor of U+D7FF is U+E000.
+    """
+    while prefix and prefix[-1] == chr(0x10FFFF):
+        prefix = prefix[:-1]
+    if not prefix:
+        return None
+    following = ord(prefix[-1]) + 1
+    if 0xD800 <= following <= 0xDFFF:
+        following = 0xE000
+    return prefix[:-1] + chr(following)
+
+
+def product_filter_clauses(filters=None):
+    """
+    WHERE clauses for the filters of app.filtering.PRODUCT_FILTERS.
+    """
+    filters = filters or {}
+    clauses = []
+    if "section_id" in filters:
+        clauses.append(Product.section_id == filters["section_id"])
+    if "available" in filters:
+        clauses.append(Product.is_product_available == filters["available"])
+    if "min_price" in filters:
+        clauses.append(Product.price_per_unit >= filters["min_price"])
+    if "max_price" in filters:
+        clauses.append(Product.price_per_unit <= filters["max_price"])
+    if "max_quantity" in filters:
+        clauses.append(Product.quantity_in_stock <= filters["max_quantity"])
+    if "name_prefix" in filters:
+        prefix = filters["name_prefix"]
+        clauses.append(Product.product_name >= prefix)
+        upper_bound = prefix_upper_bound(prefix)
+        if upper_bound is not None:
+            clauses.append(Product.product_name < upper_bound)
+    return clauses
+
+
+def product_order_by(sort="product_id"):
+    """
+    ORDER BY for `sort`, ties broken by product ID.
+    """
+    column = getattr(Product, sort.lstrip("-"))
+    if sort.startswith("-"):
+        order = [column.desc()]
+        if column is not Product.product_id:
+            order.append(Product.product_id.desc())
+    else:
+        order = [column]
+        if column is not Product.product_id:
+            order.append(Product.product_id)
+    return order
+
+
+def product_keyset_clause(sort, after):
+    """
+    WHERE clause selecting the products after the cursor position `after`,
+    or None for the first page.
+    """
+    descending = sort.startswith("-")
+    field = sort.lstrip("-")
+    if field == "product_id":
+        if check_id_cursor(after) is None:
+            return None
+        return Product.product_id < after if descending else Product.product_id > after
+    column = getattr(Product, field)
+    if check_sort_cursor(after, column.type.python_type, column.nullable) is None:
+        return None
+    key = tuple_(column, Product.product_id)
+    position = tuple_(*after)
+    return key < position if descending else key > position
+
+
+def filtered_products_query(filters=None, sort="product_id"):
+    """
+    Product query with the filters of app.filtering.PRODUCT_FILTERS applied
+    as WHERE clauses and `sort` as ORDER BY, ties broken by product ID.
+    """
+    return (
+        Product.query.options(joinedload(Product.section))
+        .filter(*product_filter_clauses(filters))
+        .order_by(*product_order_by(sort))
+    )
+
+
+# Columns behind each field of app.filtering.PRODUCT_FIELDS and
+# SECTION_FIELDS, for the row read path.
+PRODUCT_ROW_COLUMNS = {
+    "product_id": Product.product_id,
+    "section_id": Product.section_id,
+    "product_name": Product.product_name,
+    "quantity_in_stock": Product.quantity_in_stock,
+    "price_per_unit": Product.price_per_unit,
+    "is_product_available": Product.is_product_available,
+    "section": Section.section_name.label("section"),
+}
+
+SECTION_ROW_COLUMNS = {
+    "section_id": Section.section_id,
+    "section_name": Section.section_name,
+}
+
+
+def product_rows_select(fields, filters=None, sort="product_id"):
+    """
+    Core SELECT of only the `fields` columns, followed by the product ID and
+    sort value as cursor_id and cursor_value for keyset pagination.
+    Sections are only joined when the section name is asked for.
+    """
+    statement = select(
+        *(PRODUCT_ROW_COLUMNS[field] for field in fields),
+        Product.product_id.label("cursor_id"),
+        getattr(Product, sort.lstrip("-")).label("cursor_value"),
+    ).select_from(Product)
+    if "section" in fields:
+        statement = statement.join(Section, Section.section_id == Product.section_id)
+    return statement.where(*product_filter_clauses(filters)).order_by(
+        *product_order_by(sort)
+    )
+
+
+def section_rows_select(fields):
+    """
+    Core SELECT of the `fields` columns of sections, followed by the section
+    ID as cursor_id, ordered by ID.
+    """
+    return select(
+        *(SECTION_ROW_COLUMNS[field] for field in fields),
+        Section.section_id.label("cursor_id"),
+    ).order_by(Section.section_id)
+
+
+# IDs per WHERE ... IN, below SQLite's default limit of 999 bound parameters.
+IN_CHUNK_SIZE = 500
+
+
+def rows_by_ids(statement, id_column, ids):
+    """
+    Run `statement`, whose rows carry their ID as cursor_id, once per chunk
+    of `ids`. Returns the rows found in the order of `ids`, duplicates
+    dropped, and the IDs that matched nothing.
+    """
+    ids = list(dict.fromkeys(ids))
+    found = {}
+    for start in range(0, len(ids), IN_CHUNK_SIZE):
+        chunk = ids[start:start + IN_CHUNK_SIZE]
+        for row in db.session.execute(statement.where(id_column.in_(chunk))):
+            found[row.cursor_id] = row
+    rows = [found[row_id] for row_id in ids if row_id in found]
+    missing = [row_id for row_id in ids if row_id not in found]
+    return rows, missing
+
+
+# Pause between the transactions of a chunked delete, so writers waiting in
+# SQLite's busy handler get the lock before the next chunk takes it.
+DELETE_CHUNK_PAUSE = 0.01
+
+
+def delete_products_in_chunks(clauses, chunk_size):
+    """
+    Delete the products matching `clauses`, at most `chunk_size` per
+    transaction, so the write lock is released between chunks. A product
+    that stops matching before its chunk runs is kept. Returns the number
+    of products deleted.
+    """
+    deleted = 0
+    while True:
+        product_ids = db.session.execute(
+            select(Product.product_id)
+            .where(*clauses)
+            .order_by(Product.product_id)
+            .limit(chunk_size)
+        ).scalars().all()
+        if not product_ids:
+            return deleted
+        deleted_ids = db.session.execute(
+            delete(Product)
+            .where(Product.product_id.in_(product_ids), *clauses)
+            .returning(Product.product_id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        TableVersionService.bump("products")
+        ChangeService.record("product", "delete", deleted_ids)
+        db.session.commit()
+        service_cache.invalidate(*(product_cache_key(product_id) for product_id in product_ids))
+        deleted += len(deleted_ids)
+        service_logger.debug("Deleted a chunk of %s products", len(deleted_ids))
+        if len(product_ids) < chunk_size:
+            return deleted
+        time.sleep(DELETE_CHUNK_PAUSE)
+
+
+def rows_to_dicts(fields, rows):
+    """
+    Serialize rows whose first values are `fields`; trailing cursor
+    columns are dropped by zip.
+    """
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def aggregate_section_summary_query():
+    """
+    One row per section with its product count, units in stock, stock value
+    and number of available products, aggregated in the database.
+    """
+    available = case((Product.is_product_available.is_(True), 1), else_=0)
+    return (
+        select(
+            Section.section_id,
+            Section.section_name,
+            func.count(Product.product_id).label("product_count"),
+            func.coalesce(func.sum(Product.quantity_in_stock), 0).label("total_units"),
+            func.coalesce(
+                func.sum(Product.quantity_in_stock * Product.price_per_unit), 0
+            ).label("inventory_value"),
+            func.coalesce(func.sum(available), 0).label("available_count"),
+        )
+        .outerjoin(Product, Product.section_id == Section.section_id)
+        .group_by(Section.section_id, Section.section_name)
+        .order_by(Section.section_id)
+    )
+
+
+def section_summary_query():
+    """
+    Same rows as aggregate_section_summary_query. On SQLite they come from
+    the section_stats counters, one row per section, without reading
+    products.
+    """
+    if db.engine.dialect.name != "sqlite":
+        return aggregate_section_summary_query()
+    return (
+        select(
+            Section.section_id,
+            Section.section_name,
+            func.coalesce(SectionStats.product_count, 0).label("product_count"),
+            func.coalesce(SectionStats.total_units, 0).label("total_units"),
+            func.coalesce(SectionStats.inventory_value, 0).label("inventory_value"),
+            func.coalesce(SectionStats.available_count, 0).label("available_count"),
+        )
+        .outerjoin(SectionStats, SectionStats.section_id == Section.section_id)
+        .order_by(Section.section_id)
+    )
+
+
+SECTION_STATS_COUNTERS = (
+    "product_count",
+    "total_units",
+    "inventory_value",
+    "available_count",
+)
+
+
+def summary_to_dict(row):
+    return {
+        "section_id": row.section_id,
+        "section_name": row.section_name,
+        "product_count": row.product_count,
+        "total_units": row.total_units,
+        "inventory_value": row.inventory_value,
+        "available_count": row.available_count,
+        "unavailable_count": row.product_count - row.available_count,
+    }
+
+
+products_fts = table("products_fts", column("rowid"), column("rank"))
+
+
+def search_match_expression(terms):
+    """
+    FTS5 query matching every term as a prefix, e.g. ["lap", "pro"] becomes
+    '"lap"* "pro"*'. Terms are quoted so they are never read as operators.
+    """
+    quoted = ('"' + term.replace('"', '""') + '"*' for term in terms)
+    return " ".join(quoted)
+
+
+def build_stock_movement_statement():
+    """
+    Single UPDATE applying :delta to the stock of :moved_product_id, guarded so
+    stock never goes negative, with availability derived from the new
+    quantity. No row is returned when the product is missing or the guard
+    fails. Built once on the Core table and reused with new parameters.
+    """
+    products = Product.__table__
+    new_quantity = products.c.quantity_in_stock + bindparam("delta")
+    return (
+        update(products)
+        .where(products.c.product_id == bindparam("moved_product_id"), new_quantity >= 0)
+        .values(quantity_in_stock=new_quantity, is_product_available=new_quantity > 0)
+        .returning(
+            products.c.product_id,
+            products.c.quantity_in_stock,
+            products.c.is_product_available,
+        )
+    )
+
+
+stock_movement_statement = build_stock_movement_statement()
+
+
+def patch_statement(table, key_column, key, changes):
+    """
+    UPDATE of only the `changes` columns of one row, returning the whole
+    row, so a partial update needs no SELECT before or after it.
+    """
+    return (
+        update(table)
+        .where(key_column == key)
+        .values(**changes)
+        .returning(*table.c)
+    )
+
+
+def stock_to_dict(row):
+    return {
+        "product_id": row.product_id,
+        "quantity_in_stock": row.quantity_in_stock,
+        "is_product_available": row.is_product_available,
+    }
+
+
+def is_unique_violation(error):
+    message = str(error.orig).lower()
+    return "unique" in message or "duplicate" in message
+
+
+def is_foreign_key_violation(error):
+    return "foreign key" in str(error.orig).lower()
+
+
+def raise_missing_section(section_id):
+    """
+    Raise the error for a product write naming a section that does not
+    exist. The section checks go through the cache, so the foreign key can
+    still catch a section another process deleted in the meantime.
+    """
+    service_logger.error("Section with ID %s does not exist", section_id)
+    raise InvalidSectionException(f"Section with ID {section_id} does not exist")
+
+
+@timed_methods("service")
+class TableVersionService:
+    @staticmethod
+    def bump(*table_names):
+        """
+        Increment the change counters of the given tables in the current
+        transaction. Every service write calls this before committing.
+        """
+        db.session.execute(
+            update(TableVersion)
+            .where(TableVersion.table_name.in_(table_names))
+            .values(version=TableVersion.version + 1)
+        )
+
+    @staticmethod
+    def get_versions(*table_names):
+        rows = db.session.query(TableVersion.table_name, TableVersion.version).filter(
+            TableVersion.table_name.in_(table_names)
+        )
+        versions = dict(rows.all())
+        return tuple(versions.get(table_name, 0) for table_name in table_names)
+
+
+# Entries compacted per transaction, so compaction never holds the write
+# lock for long.
+COMPACTION_WINDOW = 10000
+
+
+# A plain Core executemany, which skips the ORM bulk insert machinery.
+change_insert = insert(Change.__table__)
+
+
+def change_to_dict(row, data):
+    return {
+        "seq": row.seq,
+        "entity": row.entity,
+        "id": row.entity_id,
+        "op": row.op,
+        "changed_at": row.changed_at.isoformat(),
+        "data": data,
+    }
+
+
+@timed_methods("service")
+class ChangeService:
+    @staticmethod
+    def record(entity, op, entity_ids):
+        """
+        Append a change of `op` ("create", "update" or "delete") to each row
+        of `entity` ("section" or "product") in `entity_ids`, in the current
+        transaction. Every service write calls this before committing.
+        """
+        if entity_ids:
+            db.session.execute(
+                change_insert,
+                [{"entity": entity, "entity_id": entity_id, "op": op}
+                 for entity_id in entity_ids],
+            )
+
+    @staticmethod
+    def get_last_seq():
+        return db.session.execute(select(func.max(Change.seq))).scalar() or 0
+
+    @staticmethod
+    def get_changes(since, limit):
+        """
+        Up to `limit` changes after sequence number `since`, oldest first.
+        Creates and updates carry the row as it is now, or None when a later
+        change deleted it. Returns (changes, has_more).
+        """
+        rows = db.session.execute(
+            select(Change.seq, Change.entity, Change.entity_id, Change.op, Change.changed_at)
+            .where(Change.seq > since)
+            .order_by(Change.seq)
+            .limit(limit + 1)
+        ).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        live_ids = {"section": [], "product": []}
+        for row in rows:
+            if row.op != "delete":
+                live_ids[row.entity].append(row.entity_id)
+        section_rows, _ = rows_by_ids(
+            section_rows_select(SECTION_FIELDS), Section.section_id, live_ids["section"]
+        )
+        product_rows, _ = rows_by_ids(
+            product_rows_select(PRODUCT_FIELDS), Product.product_id, live_ids["product"]
+        )
+        current = {
+            ("section", data["section_id"]): data
+            for data in rows_to_dicts(SECTION_FIELDS, section_rows)
+        }
+        current.update(
+            (("product", data["product_id"]), data)
+            for data in rows_to_dicts(PRODUCT_FIELDS, product_rows)
+        )
+        changes = [
+            change_to_dict(row, current.get((row.entity, row.entity_id)))
+            for row in rows
+        ]
+        return changes, has_more
+
+    @staticmethod
+    def compact(before_seq):
+        """
+        Delete the changes up to `before_seq` that a later change to the same
+        row supersedes, COMPACTION_WINDOW sequence numbers per transaction.
+        Replaying the log from any point still ends at the same state.
+        Returns the number of changes deleted.
+        """
+        later = Change.__table__.alias("later")
+        changes = Change.__table__
+        superseded = exists().where(
+            later.c.entity == changes.c.entity,
+            later.c.entity_id == changes.c.entity_id,
+            later.c.seq > changes.c.seq,
+        )
+        start = db.session.execute(select(func.min(Change.seq))).scalar()
+        deleted = 0
+        while start is not None and start <= before_seq:
+            stop = min(start + COMPACTION_WINDOW, before_seq + 1)
+            deleted += db.session.execute(
+                delete(changes).where(
+                    changes.c.seq >= start, changes.c.seq < stop, superseded
+                )
+            ).rowcount
+            db.session.commit()
+            start = stop
+        service_logger.info("Compacted %s changes up to seq %s", deleted, before_seq)
+        return deleted
+
+
+@timed_methods("service")
 class SectionService:
     @staticmethod
     def get_all_sections():
         service_logger.info("Fetching all sections from database")
         return Section.query.all()
 
+    @staticmethod
+    def get_sections_page(limit, after_id=None):
+        service_logger.info("Fetching %s sections after ID %s", limit, after_id)
+        check_id_cursor(after_id)
+        query = Section.query.order_by(Section.section_id)
+        if after_id is not None:
+            query = query.filter(Section.section_id > after_id)
+        sections = query.limit(limit + 1).all()
+        if len(sections) > limit:
+            return sections[:limit], sections[limit - 1].section_id
+        return sections, None
+
+    @staticmethod
+    def get_section_rows(fields, limit=None, after_id=None):
+        """
+        Sections as rows of `fields` from a Core SELECT, ordered by ID. With
+        `limit`, returns a keyset page and the next position like
+        get_sections_page. Serialize with rows_to_dicts.
+        """
+        service_logger.info("Fetching %s of sections after ID %s", fields, after_id)
+        check_id_cursor(after_id)
+        statement = section_rows_select(fields)
+        if after_id is not None:
+            statement = statement.where(Section.section_id > after_id)
+        if limit is None:
+            return db.session.execute(statement).all(), None
+
+        rows = db.session.execute(statement.limit(limit + 1)).all()
+        if len(rows) > limit:
+            return rows[:limit], rows[limit - 1].cursor_id
+        return rows, None
+
+    @staticmethod
+    def get_sections_by_ids(ids, fields):
+        """
+        Rows of `fields` for the sections in `ids`, in request order, and
+        the IDs that do not exist.
+        """
+        service_logger.info("Fetching %s sections by ID", len(ids))
+        return rows_by_ids(section_rows_select(fields), Section.section_id, ids)
+
+    @staticmethod
+    def load_section_data(section_id):
+        """
+        Return the cached to_dict() of a section, or None if it does not exist.
+        """
+        def load():
+            section = db.session.get(Section, section_id)
+            return section.to_dict() if section else None
+
+        return service_cache.get_or_load(section_cache_key(section_id), load)
+
     @staticmethod
     def get_section_by_id(section_id):
-        section = Section.query.get(section_id)
-        if not section:
-            service_logger.error(f"Section with ID {section_id} not found")
+        """
+        Return a read-only CachedRecord of the section.
+        """
+        data = SectionService.load_section_data(section_id)
+        if data is None:
+            service_logger.error("Section with ID %s not found", section_id)
             raise SectionNotFoundException(f"Section with ID {section_id} not found")
-        service_logger.info(f"Found section with ID {section_id}")
-        return section
+        service_logger.info("Found section with ID %s", section_id)
+        return CachedRecord(data)
 
     @staticmethod
     def create_section(section_name):
-        existing_section = Section.query.filter_by(section_name=section_name).first()
-        if existing_section:
-            service_logger.error(f"Section with name {section_name} already exists")
+        new_section = Section(section_name=section_name)
+        db.session.add(new_section)
+        try:
+            db.session.flush()
+            TableVersionService.bump("sections")
+            ChangeService.record("section", "create", [new_section.section_id])
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if not is_unique_violation(e):
+                raise
+            service_logger.error("Section with name %s already exists", section_name)
             raise SectionAlreadyExistsException(
                 f"Section with name {section_name} already exists"
             )
-        new_section = Section(section_name=section_name)
-        db.session.add(new_section)
-        db.session.commit()
-        service_logger.info(f"Created section with name {section_name}")
+        service_logger.info("Created section with name %s", section_name)
         return new_section
 
     @staticmethod
     def update_section(section_id, section_name):
         section = Section.query.get(section_id)
         if not section:
-            service_logger.error(f"Section with ID {section_id} not found")
+            service_logger.error("Section with ID %s not found", section_id)
             raise SectionNotFoundException(f"Section with ID {section_id} not found")
 
-        existing_section = Section.query.filter_by(section_name=section_name).first()
-        if existing_section:
-            service_logger.error(f"Section with name {section_name} already exists")
+        section.section_name = section_name
+        try:
+            TableVersionService.bump("sections")
+            ChangeService.record("section", "update", [section_id])
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if not is_unique_violation(e):
+                raise
+            service_logger.error("Section with name %s already exists", section_name)
             raise SectionAlreadyExistsException(
                 f"Section with name {section_name} already exists"
             )
+        service_cache.invalidate(section_cache_key(section_id))
+        service_logger.info(
+            "Updated section with ID %s to name %s", section_id, section_name
+        )
+        return section
 
-        section.section_name = section_name
+    @staticmethod
+    def patch_section(section_id, changes):
+        """
+        Apply a partial update with one UPDATE ... RETURNING. A duplicate
+        name is caught by the unique index instead of a lookup.
+        """
+        statement = patch_statement(
+            Section.__table__, Section.section_id, section_id, changes
+        )
+        try:
+            row = db.session.execute(statement).first()
+            if row is None:
+                db.session.rollback()
+                service_logger.error("Section with ID %s not found", section_id)
+                raise SectionNotFoundException(f"Section with ID {section_id} not found")
+            TableVersionService.bump("sections")
+            ChangeService.record("section", "update", [section_id])
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if not is_unique_violation(e):
+                raise
+            service_logger.error(
+                "Section with name %s already exists", changes["section_name"]
+            )
+            raise SectionAlreadyExistsException(
+                f"Section with name {changes['section_name']} already exists"
+            )
+        service_cache.invalidate(section_cache_key(section_id))
+        service_logger.info("Patched section with ID %s", section_id)
+        return CachedRecord(dict(row._mapping))
+
+    @staticmethod
+    def get_section_summary(section_id):
+        row = db.session.execute(
+            section_summary_query().where(Section.section_id == section_id)
+        ).one_or_none()
+        if row is None:
+            service_logger.error("Section with ID %s not found", section_id)
+            raise SectionNotFoundException(f"Section with ID {section_id} not found")
+        service_logger.info("Computed summary for section with ID %s", section_id)
+        return summary_to_dict(row)
+
+    @staticmethod
+    def get_section_summaries(limit):
+        """
+        Summaries of the first `limit` sections by ID, and whether there are
+        more, from the same query as get_inventory_summary.
+        """
+        service_logger.info("Computing summaries of %s sections", limit)
+        rows = db.session.execute(section_summary_query().limit(limit + 1)).all()
+        return [summary_to_dict(row) for row in rows[:limit]], len(rows) > limit
+
+    @staticmethod
+    def get_inventory_summary():
+        service_logger.info("Computing inventory summary for all sections")
+        sections = [
+            summary_to_dict(row) for row in db.session.execute(section_summary_query())
+        ]
+        totals = {
+            key: sum(section[key] for section in sections)
+            for key in (
+                "product_count",
+                "total_units",
+                "inventory_value",
+                "available_count",
+                "unavailable_count",
+            )
+        }
+        totals["section_count"] = len(sections)
+        return {"sections": sections, "totals": totals}
+
+    @staticmethod
+    def check_section_stats():
+        """
+        Compare the section_stats counters with a fresh aggregation of
+        products. Returns one dict per section whose counters drifted, with
+        the stored and the expected values. Floating point rounding in
+        inventory_value is not reported as drift.
+        """
+        expected = {
+            row.section_id: row
+            for row in db.session.execute(aggregate_section_summary_query())
+        }
+        stored = {
+            row.section_id: row
+            for row in db.session.execute(
+                select(SectionStats.section_id, *(
+                    getattr(SectionStats, counter) for counter in SECTION_STATS_COUNTERS
+                ))
+            )
+        }
+        drifted = []
+        for section_id in sorted(expected.keys() | stored.keys()):
+            want, have = expected.get(section_id), stored.get(section_id)
+            if want is not None and have is not None and all(
+                math.isclose(getattr(have, counter), getattr(want, counter), abs_tol=1e-6)
+                for counter in SECTION_STATS_COUNTERS
+            ):
+                continue
+            drifted.append({
+                "section_id": section_id,
+                "stored": have and {c: getattr(have, c) for c in SECTION_STATS_COUNTERS},
+                "expected": want and {c: getattr(want, c) for c in SECTION_STATS_COUNTERS},
+            })
+        service_logger.info("Checked section stats, %s sections drifted", len(drifted))
+        return drifted
+
+    @staticmethod
+    def rebuild_section_stats():
+        """
+        Recompute every section's counters from products in one transaction.
+        Returns the number of sections.
+        """
+        summaries = aggregate_section_summary_query().subquery()
+        db.session.execute(delete(SectionStats))
+        db.session.execute(
+            insert(SectionStats).from_select(
+                ["section_id", *SECTION_STATS_COUNTERS],
+                select(
+                    summaries.c.section_id,
+                    *(summaries.c[counter] for counter in SECTION_STATS_COUNTERS),
+                ),
+            )
+        )
         db.session.commit()
-        service_logger.info(f"Updated section with ID {section_id} to name {section_name}")
-        return section
+        count = db.session.execute(select(func.count()).select_from(SectionStats)).scalar()
+        service_logger.info("Rebuilt section stats of %s sections", count)
+        return count
 
     @staticmethod
-    def delete_section(section_id):
+    def delete_section(section_id, chunk_size=None):
+        """
+        Delete a section, and its products through ON DELETE CASCADE. With
+        `chunk_size`, the products are first deleted that many per
+        transaction, and only the ones added meanwhile go with the section.
+        """
         section = Section.query.get(section_id)
         if not section:
-            service_logger.error(f"Section with ID {section_id} not found")
+            service_logger.error("Section with ID %s not found", section_id)
             raise SectionNotFoundException(f"Section with ID {section_id} not found")
-        Product.query.filter_by(section_id=section_id).delete()
+        if chunk_size is not None:
+            delete_products_in_chunks([Product.section_id == section_id], chunk_size)
+        # The bump takes the write lock, so no product can join the section
+        # between listing the products and the cascade deleting them.
+        TableVersionService.bump("sections", "products")
+        product_ids = db.session.execute(
+            select(Product.product_id).where(Product.section_id == section_id)
+        ).scalars().all()
+        ChangeService.record("product", "delete", product_ids)
+        ChangeService.record("section", "delete", [section_id])
         db.session.delete(section)
         db.session.commit()
-        service_logger.info(f"Deleted section with ID {section_id}")
+        service_cache.invalidate(
+            section_cache_key(section_id),
+            *(product_cache_key(product_id) for product_id in product_ids),
+        )
+        service_logger.info("Deleted section with ID %s", section_id)
         return section
 
 
+@timed_methods("service")
 class ProductService:
     @staticmethod
-    def get_all_products():
+    def get_all_products(filters=None, sort="product_id"):
         service_logger.info("Fetching all products from database")
-        return Product.query.all()
+        return filtered_products_query(filters, sort).all()
+
+    @staticmethod
+    def get_products_page(limit, after=None, filters=None, sort="product_id"):
+        """
+        Keyset page of products. `after` is the position returned for the
+        previous page: a product ID, or a [sort value, product ID] pair when
+        sorting by another column.
+        """
+        service_logger.info("Fetching %s products after %s", limit, after)
+        field = sort.lstrip("-")
+        query = filtered_products_query(filters, sort)
+        keyset = product_keyset_clause(sort, after)
+        if keyset is not None:
+            query = query.filter(keyset)
+
+        products = query.limit(limit + 1).all()
+        if len(products) <= limit:
+            return products, None
+        last = products[limit - 1]
+        if field == "product_id":
+            return products[:limit], last.product_id
+        return products[:limit], [getattr(last, field), last.product_id]
+
+    @staticmethod
+    def get_product_rows(fields, filters=None, sort="product_id"):
+        """
+        Every matching product as a row of `fields`, read with a Core SELECT
+        so no ORM objects are built. Serialize with rows_to_dicts.
+        """
+        service_logger.info("Fetching %s of all products", fields)
+        return db.session.execute(product_rows_select(fields, filters, sort)).all()
+
+    @staticmethod
+    def get_product_rows_page(fields, limit, after=None, filters=None, sort="product_id"):
+        """
+        Keyset page of get_product_rows, with the same cursor positions as
+        get_products_page.
+        """
+        service_logger.info("Fetching %s of %s products after %s", fields, limit, after)
+        statement = product_rows_select(fields, filters, sort)
+        keyset = product_keyset_clause(sort, after)
+        if keyset is not None:
+            statement = statement.where(keyset)
+
+        rows = db.session.execute(statement.limit(limit + 1)).all()
+        if len(rows) <= limit:
+            return rows, None
+        last = rows[limit - 1]
+        if sort.lstrip("-") == "product_id":
+            return rows[:limit], last.cursor_id
+        return rows[:limit], [last.cursor_value, last.cursor_id]
+
+    @staticmethod
+    def get_products_by_ids(ids, fields):
+        """
+        Rows of `fields` for the products in `ids`, in request order, and
+        the IDs that do not exist.
+        """
+        service_logger.info("Fetching %s products by ID", len(ids))
+        return rows_by_ids(product_rows_select(fields), Product.product_id, ids)
+
+    @staticmethod
+    def iter_all_products(batch_size=1000):
+        service_logger.info("Streaming all products in batches of %s", batch_size)
+        query = (
+            Product.query.options(joinedload(Product.section))
+            .order_by(Product.product_id)
+            .yield_per(batch_size)
+        )
+        yield from query
+
+    @staticmethod
+    def search_products(terms, limit, after=None):
+        """
+        Page of products whose name or section name contains a word starting
+        with each of `terms`, best matches first.
+
+        `after` is the [rank, product ID] pair returned for the previous
+        page. On SQLite the ranking is FTS5's bm25; other databases fall back
+        to a case-insensitive substring match ordered by product ID.
+        """
+        service_logger.info("Searching products for %s", terms)
+        check_search_cursor(after)
+        query = Product.query.options(joinedload(Product.section))
+        if db.engine.dialect.name == "sqlite":
+            rank = products_fts.c.rank
+            query = query.join(
+                products_fts, products_fts.c.rowid == Product.product_id
+            ).filter(
+                literal_column("products_fts").op("MATCH")(
+                    search_match_expression(terms)
+                )
+            )
+        else:
+            rank = literal(0.0)
+            for term in terms:
+                query = query.filter(Product.product_name.ilike(f"%{term}%"))
+        if after is not None:
+            query = query.filter(
+                or_(
+                    rank > after[0],
+                    and_(rank == after[0], Product.product_id > after[1]),
+                )
+            )
+
+        rows = (
+            query.add_columns(rank)
+            .order_by(rank, Product.product_id)
+            .limit(limit + 1)
+            .all()
+        )
+        products = [product for product, _ in rows[:limit]]
+        if len(rows) <= limit:
+            return products, None
+        last, last_rank = rows[limit - 1]
+        return products, [last_rank, last.product_id]
 
     @staticmethod
     def get_product_by_id(product_id):
-        product = Product.query.get(product_id)
-        if not product:
-            service_logger.error(f"Product with ID {product_id} not found")
+        """
+        Return a read-only CachedRecord of the product.
+
+        The cached product entry leaves out the section name, which is read
+        through the section cache, so renaming a section only invalidates the
+        section entry.
+        """
+        def load():
+            since = service_cache.sequence
+            product = Product.query.options(joinedload(Product.section)).get(product_id)
+            if not product:
+                return None
+            service_cache.set(
+                section_cache_key(product.section_id), product.section.to_dict(), since
+            )
+            data = product.to_dict()
+            del data["section"]
+            return data
+
+        data = service_cache.get_or_load(product_cache_key(product_id), load)
+        section = None
+        if data is not None:
+            section = SectionService.load_section_data(data["section_id"])
+        if section is None:
+            service_logger.error("Product with ID %s not found", product_id)
             raise ProductNotFoundException(f"Product with ID {product_id} not found")
-        service_logger.info(f"Found product with ID {product_id}")
-        return product
+        service_logger.info("Found product with ID %s", product_id)
+        return CachedRecord({**data, "section": section["section_name"]})
 
     @staticmethod
     def create_product(
@@ -95,21 +976,8 @@ class ProductService:
         price_per_unit,
         is_product_available,
     ):
-        section = Section.query.get(section_id)
-        if not section:
-            service_logger.error(f"Section with ID {section_id} does not exist")
-            raise InvalidSectionException(
-                f"Section with ID {section_id} does not exist"
-            )
-
-        existing_product = Product.query.filter_by(
-            product_name=product_name, section_id=section_id
-        ).first()
-        if existing_product:
-            service_logger.error(f"Product with name {product_name} already exists in section ID {section_id}")
-            raise ProductAlreadyExistsException(
-                f"Product with name {product_name} already exists in section ID {section_id}"
-            )
+        if SectionService.load_section_data(section_id) is None:
+            raise_missing_section(section_id)
 
         new_product = Product(
             section_id=section_id,
@@ -119,10 +987,224 @@ class ProductService:
             is_product_available=is_product_available,
         )
         db.session.add(new_product)
-        db.session.commit()
-        service_logger.info(f"Created product with name {product_name} in section ID {section_id}")
+        try:
+            db.session.flush()
+            TableVersionService.bump("products")
+            ChangeService.record("product", "create", [new_product.product_id])
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if is_foreign_key_violation(e):
+                raise_missing_section(section_id)
+            if not is_unique_violation(e):
+                raise
+            service_logger.error(
+                "Product with name %s already exists in section ID %s",
+                product_name,
+                section_id,
+            )
+            raise ProductAlreadyExistsException(
+                f"Product with name {product_name} already exists in section ID {section_id}"
+            )
+        service_logger.info(
+            "Created product with name %s in section ID %s", product_name, section_id
+        )
         return new_product
 
+    @staticmethod
+    def bulk_create_products(items, upsert=False):
+        """
+        Create many products in one transaction.
+
+        Sections and existing products are resolved with one query each, new
+        rows are written with a single executemany INSERT and, when `upsert`
+        is set, rows that already exist are updated in place. Returns one
+        result dict per item, in order, instead of failing the whole batch.
+        """
+        section_ids = {item["section_id"] for item in items}
+        existing_sections = {
+            section_id
+            for (section_id,) in db.session.query(Section.section_id).filter(
+                Section.section_id.in_(section_ids)
+            )
+        }
+
+        keys = {
+            (item["section_id"], item["product_name"])
+            for item in items
+            if item["section_id"] in existing_sections
+        }
+        existing_products = {}
+        if keys:
+            rows = db.session.query(
+                Product.product_id, Product.section_id, Product.product_name
+            ).filter(tuple_(Product.section_id, Product.product_name).in_(keys))
+            existing_products = {
+                (row.section_id, row.product_name): row.product_id for row in rows
+            }
+
+        results = []
+        to_insert, inserted_results, to_update = [], [], []
+        seen = set()
+        for item in items:
+            section_id, product_name = item["section_id"], item["product_name"]
+            key = (section_id, product_name)
+            values = {
+                "section_id": section_id,
+                "product_name": product_name,
+                "quantity_in_stock": item["quantity_in_stock"],
+                "price_per_unit": item["price_per_unit"],
+                "is_product_available": item["is_product_available"],
+            }
+            if section_id not in existing_sections:
+                result = {
+                    "status": "error",
+                    "error": f"Section with ID {section_id} does not exist",
+                }
+            elif key in seen:
+                result = {
+                    "status": "error",
+                    "error": f"Product with name {product_name} appears more than once for section ID {section_id}",
+                }
+            elif key in existing_products and not upsert:
+                result = {
+                    "status": "error",
+                    "error": f"Product with name {product_name} already exists in section ID {section_id}",
+                }
+            elif key in existing_products:
+                values["product_id"] = existing_products[key]
+                to_update.append(values)
+                result = {"status": "updated", "product_id": values["product_id"]}
+            else:
+                to_insert.append(values)
+                result = {"status": "created"}
+                inserted_results.append(result)
+            seen.add(key)
+            results.append(result)
+
+        try:
+            if to_insert:
+                product_ids = db.session.scalars(
+                    insert(Product).returning(
+                        Product.product_id, sort_by_parameter_order=True
+                    ),
+                    to_insert,
+                ).all()
+                for result, product_id in zip(inserted_results, product_ids):
+                    result["product_id"] = product_id
+                ChangeService.record("product", "create", product_ids)
+            if to_update:
+                db.session.execute(update(Product), to_update)
+                ChangeService.record(
+                    "product", "update", [values["product_id"] for values in to_update]
+                )
+            if to_insert or to_update:
+                TableVersionService.bump("products")
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if is_foreign_key_violation(e):
+                service_logger.error("Bulk write collided with a concurrent section delete")
+                raise InvalidSectionException(
+                    "A section in the batch was deleted concurrently, retry the request"
+                )
+            if not is_unique_violation(e):
+                raise
+            service_logger.error("Bulk write collided with a concurrent product write")
+            raise ProductAlreadyExistsException(
+                "A product in the batch was created concurrently, retry the request"
+            )
+        service_cache.invalidate(
+            *(product_cache_key(values["product_id"]) for values in to_update)
+        )
+
+        service_logger.info(
+            "Bulk write of %s products: %s created, %s updated, %s failed",
+            len(items),
+            len(to_insert),
+            len(to_update),
+            len(items) - len(to_insert) - len(to_update),
+        )
+        return results
+
+    @staticmethod
+    def move_stock(product_id, delta):
+        """
+        Add `delta` (negative to take stock out) to a product's quantity in
+        one UPDATE, without reading the row first, so concurrent movements
+        cannot overwrite each other. Returns the new stock levels.
+        """
+        row = db.session.execute(
+            stock_movement_statement, {"moved_product_id": product_id, "delta": delta}
+        ).first()
+        if row is None:
+            db.session.rollback()
+            if db.session.get(Product, product_id) is None:
+                service_logger.error("Product with ID %s not found", product_id)
+                raise ProductNotFoundException(f"Product with ID {product_id} not found")
+            service_logger.error(
+                "Not enough stock of product ID %s to apply %s", product_id, delta
+            )
+            raise InsufficientStockException(
+                f"Not enough stock of product ID {product_id} to apply {delta}"
+            )
+        TableVersionService.bump("products")
+        ChangeService.record("product", "update", [product_id])
+        db.session.commit()
+        service_cache.invalidate(product_cache_key(product_id))
+        service_logger.info("Moved %s units of product ID %s", delta, product_id)
+        return stock_to_dict(row)
+
+    @staticmethod
+    def move_stock_batch(movements):
+        """
+        Apply many stock movements in one transaction, in order, each with
+        the same guarded UPDATE as move_stock. Returns one result dict per
+        movement; movements that fail leave the stock untouched.
+        """
+        results = []
+        failed = []
+        for movement in movements:
+            product_id, delta = movement["product_id"], movement["delta"]
+            row = db.session.execute(
+                stock_movement_statement, {"moved_product_id": product_id, "delta": delta}
+            ).first()
+            if row is None:
+                result = {"status": "error", "product_id": product_id}
+                failed.append((result, delta))
+            else:
+                result = {"status": "applied", **stock_to_dict(row)}
+            results.append(result)
+
+        if failed:
+            failed_ids = {result["product_id"] for result, _ in failed}
+            existing = set(
+                db.session.scalars(
+                    select(Product.product_id).where(Product.product_id.in_(failed_ids))
+                )
+            )
+            for result, delta in failed:
+                product_id = result["product_id"]
+                if product_id in existing:
+                    result["error"] = (
+                        f"Not enough stock of product ID {product_id} to apply {delta}"
+                    )
+                else:
+                    result["error"] = f"Product with ID {product_id} not found"
+
+        applied = {
+            result["product_id"] for result in results if result["status"] == "applied"
+        }
+        if applied:
+            TableVersionService.bump("products")
+            ChangeService.record("product", "update", sorted(applied))
+        db.session.commit()
+        service_cache.invalidate(*(product_cache_key(product_id) for product_id in applied))
+        service_logger.info(
+            "Applied %s of %s stock movements", len(results) - len(failed), len(results)
+        )
+        return results
+
     @staticmethod
     def update_product(
         product_id,
@@ -134,41 +1216,121 @@ class ProductService:
     ):
         product = Product.query.get(product_id)
         if not product:
-            service_logger.error(f"Product with ID {product_id} not found")
+            service_logger.error("Product with ID %s not found", product_id)
             raise ProductNotFoundException(f"Product with ID {product_id} not found")
 
-        section = Section.query.get(section_id)
-        if not section:
-            service_logger.error(f"Section with ID {section_id} does not exist")
-            raise InvalidSectionException(
-                f"Section with ID {section_id} does not exist"
-            )
-
-        existing_product = Product.query.filter_by(
-            product_name=product_name, section_id=section_id
-        ).first()
-        if existing_product and existing_product.product_id != product_id:
-            service_logger.error(f"Product with name {product_name} already exists in section ID {section_id}")
-            raise ProductAlreadyExistsException(
-                f"Product with name {product_name} already exists in section ID {section_id}"
-            )
+        if SectionService.load_section_data(section_id) is None:
+            raise_missing_section(section_id)
 
         product.section_id = section_id
         product.product_name = product_name
         product.quantity_in_stock = quantity_in_stock
         product.price_per_unit = price_per_unit
         product.is_product_available = is_product_available
-        db.session.commit()
-        service_logger.info(f"Updated product with ID {product_id}")
+        try:
+            TableVersionService.bump("products")
+            ChangeService.record("product", "update", [product_id])
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if is_foreign_key_violation(e):
+                raise_missing_section(section_id)
+            if not is_unique_violation(e):
+                raise
+            service_logger.error(
+                "Product with name %s already exists in section ID %s",
+                product_name,
+                section_id,
+            )
+            raise ProductAlreadyExistsException(
+                f"Product with name {product_name} already exists in section ID {section_id}"
+            )
+        service_cache.invalidate(product_cache_key(product_id))
+        service_logger.info("Updated product with ID %s", product_id)
         return product
 
+    @staticmethod
+    def patch_product(product_id, changes):
+        """
+        Apply a partial update with one UPDATE ... RETURNING.
+
+        Only a new section_id is looked up, through the section cache; a
+        duplicate name is caught by the unique index. Returns a read-only
+        CachedRecord shaped like get_product_by_id.
+        """
+        if "section_id" in changes and (
+            SectionService.load_section_data(changes["section_id"]) is None
+        ):
+            raise_missing_section(changes["section_id"])
+
+        statement = patch_statement(
+            Product.__table__, Product.product_id, product_id, changes
+        )
+        try:
+            row = db.session.execute(statement).first()
+            if row is None:
+                db.session.rollback()
+                service_logger.error("Product with ID %s not found", product_id)
+                raise ProductNotFoundException(f"Product with ID {product_id} not found")
+            TableVersionService.bump("products")
+            ChangeService.record("product", "update", [product_id])
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if is_foreign_key_violation(e):
+                raise_missing_section(changes["section_id"])
+            if not is_unique_violation(e):
+                raise
+            product_name = changes.get("product_name", f"of product ID {product_id}")
+            service_logger.error(
+                "Product with name %s already exists in the target section", product_name
+            )
+            raise ProductAlreadyExistsException(
+                f"Product with name {product_name} already exists in the target section"
+            )
+        service_cache.invalidate(product_cache_key(product_id))
+        service_logger.info("Patched product with ID %s", product_id)
+
+        data = dict(row._mapping)
+        section = SectionService.load_section_data(data["section_id"])
+        return CachedRecord({**data, "section": section["section_name"]})
+
     @staticmethod
     def delete_product(product_id):
-        product = Product.query.get(product_id)
+        product = Product.query.options(joinedload(Product.section)).get(product_id)
         if not product:
-            service_logger.error(f"Product with ID {product_id} not found")
+            service_logger.error("Product with ID %s not found", product_id)
             raise ProductNotFoundException(f"Product with ID {product_id} not found")
         db.session.delete(product)
+        TableVersionService.bump("products")
+        ChangeService.record("product", "delete", [product_id])
         db.session.commit()
-        service_logger.info(f"Deleted product with ID {product_id}")
+        service_cache.invalidate(product_cache_key(product_id))
+        service_logger.info("Deleted product with ID %s", product_id)
         return product
+
+    @staticmethod
+    def delete_products(filters, chunk_size=None):
+        """
+        Delete every product matching `filters`, in one transaction or, with
+        `chunk_size`, that many per transaction. Returns the number deleted.
+        """
+        clauses = product_filter_clauses(filters)
+        if chunk_size is not None:
+            deleted = delete_products_in_chunks(clauses, chunk_size)
+        else:
+            product_ids = db.session.execute(
+                delete(Product)
+                .where(*clauses)
+                .returning(Product.product_id)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+            TableVersionService.bump("products")
+            ChangeService.record("product", "delete", product_ids)
+            db.session.commit()
+            service_cache.invalidate(
+                *(product_cache_key(product_id) for product_id in product_ids)
+            )
+            deleted = len(product_ids)
+        service_logger.info("Deleted %s products matching %s", deleted, filters)
+        return deleted
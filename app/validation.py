@@ -0,0 +1,79 @@
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+from .instrumentation import timed_phase
+from .schema import (
+    section_schema,
+    product_schema,
+    stock_movement_schema,
+    batch_stock_movement_schema,
+    batch_get_schema,
+    section_patch_schema,
+    product_patch_schema,
+)
+
+
+def compile_schema(schema):
+    """
+    Check a schema once and return a validator that can be reused.
+    """
+    validator_class = validator_for(schema)
+    validator_class.check_schema(schema)
+    return validator_class(schema)
+
+
+section_validator = compile_schema(section_schema)
+product_validator = compile_schema(product_schema)
+stock_movement_validator = compile_schema(stock_movement_schema)
+batch_stock_movement_validator = compile_schema(batch_stock_movement_schema)
+batch_get_validator = compile_schema(batch_get_schema)
+section_patch_validator = compile_schema(section_patch_schema)
+product_patch_validator = compile_schema(product_patch_schema)
+
+
+@timed_phase("validation")
+def validate_with(validator, instance):
+    """
+    Same contract as jsonschema.validate: raise the best matching ValidationError.
+    """
+    error = best_match(validator.iter_errors(instance))
+    if error is not None:
+        raise error
+
+
+def validate_section(instance):
+    validate_with(section_validator, instance)
+
+
+def validate_product(instance):
+    validate_with(product_validator, instance)
+
+
+def validate_section_patch(instance):
+    validate_with(section_patch_validator, instance)
+
+
+def validate_product_patch(instance):
+    validate_with(product_patch_validator, instance)
+
+
+def validate_stock_movement(instance):
+    validate_with(stock_movement_validator, instance)
+
+
+def validate_batch_get(instance):
+    validate_with(batch_get_validator, instance)
+
+
+@timed_phase("validation")
+def validate_many(validator, instances):
+    """
+    Validate a list of payloads, returning None or the error message for each.
+    """
+    errors = []
+    for instance in instances:
+        if validator.is_valid(instance):
+            errors.append(None)
+        else:
+            errors.append(best_match(validator.iter_errors(instance)).message)
+    return errors
+
@@ -0,0 +1,92 @@
+"""
+Concurrent read/write throughput of the SQLite engine profiles.
+
+Writers create products while readers page through them, each thread in
+its own app context, against a fresh database file per profile.
+
+    python -m benchmarks.bench_db_profiles [--readers 8] [--writers 4] [--seconds 5]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from app import create_app
+from app.models import db, Section
+from app.services import ProductService
+
+
+def run_profile(profile, readers, writers, seconds):
+    directory = tempfile.mkdtemp()
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(directory, 'bench.db')}",
+        "DATABASE_PROFILE": profile,
+    })
+    with app.app_context():
+        db.create_all()
+        db.session.add(Section(section_name="Bench"))
+        db.session.commit()
+
+    counts = {"reads": 0, "writes": 0, "locked": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def count(key):
+        with lock:
+            counts[key] += 1
+
+    def reader():
+        with app.app_context():
+            while time.monotonic() < deadline:
+                try:
+                    ProductService.get_products_page(100)
+                    count("reads")
+                except OperationalError:
+                    db.session.rollback()
+                    count("locked")
+
+    def writer(worker):
+        with app.app_context():
+            sequence = 0
+            while time.monotonic() < deadline:
+                sequence += 1
+                try:
+                    ProductService.create_product(1, f"w{worker}-{sequence}", 1, 1, True)
+                    count("writes")
+                except OperationalError:
+                    db.session.rollback()
+                    count("locked")
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        db.engine.dispose()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    for profile in ("default", "sqlite"):
+        counts = run_profile(profile, args.readers, args.writers, args.seconds)
+        print(
+            f"{profile:8} reads/s {counts['reads'] / args.seconds:9.1f}  "
+            f"writes/s {counts['writes'] / args.seconds:8.1f}  "
+            f"locked errors {counts['locked']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
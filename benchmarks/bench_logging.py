@@ -0,0 +1,73 @@
+"""
+Request latency with synchronous logging handlers versus the queue mode.
+
+Log files go to a temporary directory and console output to /dev/null.
+
+    python -m benchmarks.bench_logging [--requests 3000]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import logging_config
+from app import create_app
+from app.models import db, Section, Product
+
+
+def measure(client, path, requests):
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        client.get(path)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return (
+        statistics.median(latencies),
+        latencies[int(len(latencies) * 0.99) - 1],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    handlers = logging_config.LOGGING["handlers"]
+    handlers["console"]["stream"] = open(os.devnull, "w")
+    handlers["controller_file"]["filename"] = os.path.join(directory, "controller.log")
+    handlers["service_file"]["filename"] = os.path.join(directory, "service.log")
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    with app.app_context():
+        db.create_all()
+        section = Section(section_name="Bench")
+        db.session.add(section)
+        db.session.commit()
+        db.session.add(Product(
+            section_id=section.section_id,
+            product_name="Laptop",
+            quantity_in_stock=1,
+            price_per_unit=1,
+            is_product_available=True,
+        ))
+        db.session.commit()
+    client = app.test_client()
+
+    modes = [
+        ("sync", {"use_queue": False}),
+        ("queue", {"use_queue": True}),
+        ("queue, 10% info", {"use_queue": True, "sample_rate": 0.1}),
+    ]
+    for name, options in modes:
+        logging_config.configure_logging(level="DEBUG", **options)
+        measure(client, "/products/1", 100)
+        p50, p99 = measure(client, "/products/1", args.requests)
+        print(f"{name:16} p50 {p50 * 1e6:8.1f} us   p99 {p99 * 1e6:8.1f} us")
+    logging_config.stop_listeners()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Longest SQLite write-lock hold while purging a large section, in one
+transaction versus chunked, and how long a concurrent writer waits.
+
+Each variant deletes every product of a section holding --products
+products. The hold time of a transaction runs from its first write
+statement to the end of its commit. Meanwhile another thread keeps moving
+stock of a product in a different section, as API requests would.
+
+    python -m benchmarks.bench_purge [--products 100000] [--chunk-size 500]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event
+
+from app import create_app
+from app.models import db, Product
+from app.services import ProductService, SectionService
+from benchmarks.seed import seed
+from benchmarks.suite import percentile
+
+WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE")
+
+
+class LockHoldRecorder:
+    """
+    Record how long each transaction on the purging thread holds the write
+    lock.
+    """
+
+    def __init__(self, engine, session):
+        self.thread_id = threading.get_ident()
+        self.started = None
+        self.holds = []
+        event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(session, "after_commit", self.after_commit)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if (
+            self.started is None
+            and threading.get_ident() == self.thread_id
+            and statement.lstrip().upper().startswith(WRITE_PREFIXES)
+        ):
+            self.started = time.perf_counter()
+
+    def after_commit(self, session):
+        if self.started is not None and threading.get_ident() == self.thread_id:
+            self.holds.append(time.perf_counter() - self.started)
+            self.started = None
+
+
+def concurrent_writer(app, product_id, stop, latencies, errors):
+    with app.app_context():
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                ProductService.move_stock(product_id, 1)
+            except Exception as e:
+                db.session.rollback()
+                if not isinstance(getattr(e, "orig", None), sqlite3.OperationalError):
+                    raise
+                errors.append(e)
+            latencies.append(time.perf_counter() - started)
+            time.sleep(0.001)
+
+
+def run_variant(purge, products, chunk_size):
+    directory = tempfile.mkdtemp()
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(directory, 'bench.db')}",
+    })
+    with app.app_context():
+        db.create_all()
+        seed(db.engine, products, sections=1)
+        other = SectionService.create_section("Other")
+        product_id = ProductService.create_product(
+            other.section_id, "Concurrent", 0, 1, True
+        ).product_id
+
+        recorder = LockHoldRecorder(db.engine, db.session)
+        stop = threading.Event()
+        latencies, errors = [], []
+        writer = threading.Thread(
+            target=concurrent_writer, args=(app, product_id, stop, latencies, errors)
+        )
+        writer.start()
+        time.sleep(0.05)
+        started = time.perf_counter()
+        purge(chunk_size)
+        elapsed = time.perf_counter() - started
+        time.sleep(0.05)
+        stop.set()
+        writer.join()
+        assert db.session.query(Product).filter_by(section_id=1).count() == 0
+        db.engine.dispose()
+
+    latencies.sort()
+    return {
+        "elapsed": elapsed,
+        "transactions": len(recorder.holds),
+        "max_hold": max(recorder.holds),
+        "writer_p50": percentile(latencies, 0.50),
+        "writer_max": latencies[-1],
+        "writer_errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    variants = [
+        ("delete_section, one transaction",
+         lambda chunk_size: SectionService.delete_section(1)),
+        ("delete_section, chunked",
+         lambda chunk_size: SectionService.delete_section(1, chunk_size)),
+        ("delete_products, one transaction",
+         lambda chunk_size: ProductService.delete_products({"section_id": 1})),
+        ("delete_products, chunked",
+         lambda chunk_size: ProductService.delete_products({"section_id": 1}, chunk_size)),
+    ]
+    print(f"{args.products} products in the purged section, chunks of {args.chunk_size}")
+    for name, purge in variants:
+        result = run_variant(purge, args.products, args.chunk_size)
+        print(
+            f"  {name:34} total {result['elapsed'] * 1000:8.1f} ms  "
+            f"{result['transactions']:4} txns  "
+            f"max lock hold {result['max_hold'] * 1000:8.1f} ms  "
+            f"writer p50 {result['writer_p50'] * 1000:6.1f} / "
+            f"max {result['writer_max'] * 1000:8.1f} ms  "
+            f"{result['writer_errors']} errors"
+        )
+
+
+if __name__ == "__main__":
+    main()
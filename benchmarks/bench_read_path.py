@@ -0,0 +1,79 @@
+"""
+CPU time and peak memory of listing every product through the ORM versus
+the Core row path, with and without a ?fields= projection.
+
+Each variant reads all products, serializes them to dicts and encodes the
+JSON body, as GET /products does.
+
+    python -m benchmarks.bench_read_path [--products 100000] [--repeat 3]
+"""
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from app import create_app
+from app.filtering import PRODUCT_FIELDS
+from app.models import db
+from app.services import ProductService, rows_to_dicts
+from benchmarks.seed import seed
+
+
+def orm_path():
+    return json.dumps([product.to_dict() for product in ProductService.get_all_products()])
+
+
+def row_path(fields):
+    def run():
+        return json.dumps(rows_to_dicts(fields, ProductService.get_product_rows(fields)))
+    return run
+
+
+def measure(run, repeat):
+    cpu = []
+    for _ in range(repeat):
+        db.session.remove()
+        gc.collect()
+        started = time.process_time()
+        run()
+        cpu.append(time.process_time() - started)
+
+    db.session.remove()
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(cpu), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(directory, 'bench.db')}",
+    })
+    variants = [
+        ("ORM objects + to_dict", orm_path),
+        ("Core rows, all fields", row_path(PRODUCT_FIELDS)),
+        ("Core rows, without section", row_path(PRODUCT_FIELDS[:-1])),
+        ("Core rows, id and name", row_path(("product_id", "product_name"))),
+    ]
+    with app.app_context():
+        db.create_all()
+        seed(db.engine, args.products)
+        print(f"{args.products} products")
+        for name, run in variants:
+            cpu, peak = measure(run, args.repeat)
+            print(f"  {name:28} CPU {cpu * 1000:9.1f} ms   peak {peak / 2**20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
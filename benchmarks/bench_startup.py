@@ -0,0 +1,149 @@
+"""
+Startup time of the API, broken down by import and initialization step.
+
+Every run starts a fresh interpreter, so module imports are measured cold.
+The p50 of each step is compared with the "startup" entry of
+benchmarks/baseline.json, like the scale suite does for requests.
+
+    python -m benchmarks.bench_startup [--runs 20]
+    python -m benchmarks.bench_startup --update-baseline
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_startup():
+    """
+    Time each startup step in this process. Only meaningful in a fresh
+    interpreter, see main().
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    def step(name):
+        nonlocal started
+        now = time.perf_counter()
+        timings[name] = now - started
+        started = now
+
+    import flask, flask_sqlalchemy, sqlalchemy  # noqa: E401,F401
+    step("import flask and sqlalchemy")
+    from logging_config import configure_logging
+    configure_logging()
+    step("configure_logging")
+    import app.models  # noqa: F401
+    step("import app.models")
+    import app.services  # noqa: F401
+    step("import app.services")
+    import app.controllers  # noqa: F401
+    step("import app.controllers")
+    from app import create_app
+    application = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    step("create_app")
+
+    from app.models import db
+    with application.app_context():
+        db.create_all()
+    started = time.perf_counter()
+    client = application.test_client()
+    client.get("/sections")
+    step("first request")
+    client.get("/apispec_1.json")
+    step("first /apispec_1.json")
+    timings["total"] = sum(timings.values())
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--threshold", type=float, default=0.3)
+    parser.add_argument("--min-delta-ms", type=float, default=2.0)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="record the steps missing from the baseline")
+    parser.add_argument("--overwrite-baseline", action="store_true",
+                        help="with --update-baseline, also replace existing entries")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_startup()))
+        return
+
+    # The suite imports the app, so keep it out of the child processes.
+    from benchmarks.suite import BASELINE_PATH, percentile
+
+    samples = {}
+    directory = tempfile.mkdtemp()
+    env = {**os.environ, "PYTHONPATH": ROOT, "LOG_LEVEL": "WARNING"}
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+            cwd=directory,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        for name, seconds in json.loads(output.splitlines()[-1]).items():
+            samples.setdefault(name, []).append(seconds)
+
+    results = {}
+    for name, values in samples.items():
+        values.sort()
+        results[name] = {
+            "runs": len(values),
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+        }
+        print(f"  {name:30} p50 {results[name]['p50_ms']:8.2f}  "
+              f"p95 {results[name]['p95_ms']:8.2f} ms")
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+    if args.update_baseline:
+        recorded = baseline.setdefault("startup", {})
+        for name, stats in results.items():
+            if args.overwrite_baseline or name not in recorded:
+                recorded[name] = stats
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {BASELINE_PATH}")
+        return
+    if "startup" not in baseline:
+        print("\nNo startup baseline, run with --update-baseline first")
+        return
+    regressions = []
+    for name, stats in results.items():
+        previous = baseline["startup"].get(name)
+        if previous is None:
+            continue
+        slower_by = stats["p50_ms"] - previous["p50_ms"]
+        if slower_by > previous["p50_ms"] * args.threshold and slower_by > args.min_delta_ms:
+            regressions.append(
+                f"{name}: p50 {stats['p50_ms']:.2f} ms "
+                f"vs baseline {previous['p50_ms']:.2f} ms"
+            )
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\nNo regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
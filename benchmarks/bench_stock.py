@@ -0,0 +1,100 @@
+"""
+Concurrent stock movements: read-modify-write through update_product
+against the single guarded UPDATE of move_stock.
+
+Every thread adds one unit at a time to products picked from a small hot
+set, so the final stock shows how many movements were lost.
+
+    python -m benchmarks.bench_stock [--threads 8] [--products 10] [--seconds 5]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+from app import create_app
+from app.models import db, Product
+from app.services import ProductService, service_cache
+from benchmarks.seed import seed
+
+
+def read_modify_write(product_id):
+    product = ProductService.get_product_by_id(product_id)
+    ProductService.update_product(
+        product_id,
+        product.section_id,
+        product.product_name,
+        product.quantity_in_stock + 1,
+        product.price_per_unit,
+        True,
+    )
+
+
+def atomic(product_id):
+    ProductService.move_stock(product_id, 1)
+
+
+def run_strategy(move, threads, products, seconds):
+    directory = tempfile.mkdtemp()
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(directory, 'bench.db')}",
+        "DATABASE_PROFILE": "sqlite",
+    })
+    with app.app_context():
+        db.create_all()
+        seed(db.engine, products)
+        start_units = db.session.query(func.sum(Product.quantity_in_stock)).scalar()
+    service_cache.clear()
+
+    counts = {"moves": 0, "locked": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def worker(seed_value):
+        rng = random.Random(seed_value)
+        with app.app_context():
+            while time.monotonic() < deadline:
+                try:
+                    move(rng.randint(1, products))
+                    key = "moves"
+                except OperationalError:
+                    db.session.rollback()
+                    key = "locked"
+                with lock:
+                    counts[key] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    with app.app_context():
+        end_units = db.session.query(func.sum(Product.quantity_in_stock)).scalar()
+        db.engine.dispose()
+    counts["lost"] = counts["moves"] - (end_units - start_units)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--products", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    for name, move in (("read-modify-write", read_modify_write), ("move_stock", atomic)):
+        counts = run_strategy(move, args.threads, args.products, args.seconds)
+        print(
+            f"{name:18} movements/s {counts['moves'] / args.seconds:8.1f}  "
+            f"lost updates {counts['lost']:6}  locked errors {counts['locked']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
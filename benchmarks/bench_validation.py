@@ -0,0 +1,42 @@
+"""
+Compare per-request jsonschema.validate with the precompiled validators.
+
+    python -m benchmarks.bench_validation [--number 20000]
+"""
+import argparse
+import timeit
+
+from jsonschema import validate
+
+from app.schema import product_schema
+from app.validation import product_validator, validate_many, validate_product
+
+
+PAYLOAD = {
+    "section_id": 1,
+    "product_name": "Laptop",
+    "quantity_in_stock": 50,
+    "price_per_unit": 1000,
+    "is_product_available": True,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    batch = [PAYLOAD] * 1000
+    cases = [
+        ("jsonschema.validate", lambda: validate(instance=PAYLOAD, schema=product_schema), 1),
+        ("validate_product", lambda: validate_product(PAYLOAD), 1),
+        ("validate_many", lambda: validate_many(product_validator, batch), len(batch)),
+    ]
+    for name, case, payloads_per_call in cases:
+        number = max(1, args.number // payloads_per_call)
+        seconds = timeit.timeit(case, number=number)
+        per_payload = seconds / (number * payloads_per_call)
+        print(f"{name:24} {per_payload * 1e6:8.2f} us/payload")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Throughput of the prefork server from 1 to N worker processes.
+
+For each worker count the benchmark starts `python main.py serve` against a
+seeded SQLite database, drives it for --seconds with client processes that
+open a new connection per request, and reports requests per second and the
+speed-up over a single worker. Worker counts double from 1 up to
+--max-workers.
+
+    python -m benchmarks.bench_workers [--max-workers 8] [--clients 16] [--seconds 5]
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.seed import seed
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def wait_until_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def client(port, paths, seconds, results):
+    rng = random.Random(os.getpid())
+    deadline = time.monotonic() + seconds
+    done = errors = 0
+    while time.monotonic() < deadline:
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        try:
+            connection.request("GET", rng.choice(paths))
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors += 1
+            else:
+                done += 1
+        except OSError:
+            errors += 1
+        finally:
+            connection.close()
+    results.put((done, errors))
+
+
+def run(workers, clients, seconds, database, paths):
+    port = free_port()
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{database}", "LOG_LEVEL": "WARNING"}
+    server = subprocess.Popen(
+        [sys.executable, "main.py", "serve", "--workers", str(workers),
+         "--port", str(port)],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(port)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=client, args=(port, paths, seconds, results))
+            for _ in range(clients)
+        ]
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+    return sum(done for done, _ in totals), sum(errors for _, errors in totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--products", type=int, default=10000)
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.models import db
+
+    database = os.path.join(tempfile.mkdtemp(), "bench.db")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{database}"})
+    with app.app_context():
+        db.create_all()
+        sections = seed(db.engine, args.products)
+        db.engine.dispose()
+
+    paths = [f"/products/{i}" for i in range(1, args.products + 1, 97)]
+    paths += [f"/sections/{i}/summary" for i in range(1, sections + 1)]
+    paths += ["/products?limit=100"]
+
+    single = None
+    workers = 1
+    while workers <= args.max_workers:
+        done, errors = run(workers, args.clients, args.seconds, database, paths)
+        throughput = done / args.seconds
+        single = single or throughput
+        print(
+            f"{workers:3} workers  {throughput:9.1f} req/s  "
+            f"x{throughput / single:5.2f}  errors {errors}"
+        )
+        workers *= 2
+        if workers > args.max_workers and workers // 2 < args.max_workers:
+            workers = args.max_workers
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,533 @@
+"""
+Scale benchmark suite for the HTTP routes and the service layer.
+
+For each catalogue size the suite seeds a SQLite database once, and every
+case starts from a fresh copy of it, so no case measures rows an earlier
+write case added. A case runs until it reaches --iterations runs or
+--case-seconds of timed work. The whole set of cases runs --repeats times,
+interleaved, and each statistic is the median over the repeats.
+
+Results are compared with a stored baseline. A case regresses when its
+p50 or p95 is slower than the baseline by more than --threshold, by more
+than --min-delta-ms and by more than --noise-factor times the spread
+between repeats, in the baseline or in this run. The exit status is then 1.
+
+    python -m benchmarks.suite --sizes 1000,100000
+    python -m benchmarks.suite --sizes 1000,100000 --update-baseline
+
+--update-baseline only adds cases the baseline does not have yet, so the
+existing entries stay a stable reference. Replacing them takes
+--overwrite-baseline and a commit of its own that says why.
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from app import create_app
+from app.models import db
+from app.filtering import PRODUCT_FIELDS, SECTION_FIELDS
+from app.services import ChangeService, SectionService, ProductService, service_cache
+from benchmarks.seed import seed
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Default allowed slowdown. Three runs of the same tree on a single-CPU
+# machine differed by up to 44% in a case p50 and 62% in a p95; the cases
+# beyond 50% also had wide repeat spreads, so no run failed against another.
+THRESHOLD = 0.5
+
+
+class Case:
+    def __init__(self, name, run, setup=None, route=None, service=None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.route = route
+        self.service = service
+
+
+def product_payload(section_id, name):
+    return {
+        "section_id": section_id,
+        "product_name": name,
+        "quantity_in_stock": 10,
+        "price_per_unit": 5,
+        "is_product_available": True,
+    }
+
+
+def build_cases(app, products, sections):
+    client = app.test_client()
+    rng = random.Random(0)
+    unique = itertools.count()
+
+    def product_id():
+        return rng.randint(1, products)
+
+    def section_id():
+        return rng.randint(1, sections)
+
+    def new_section():
+        return SectionService.create_section(f"Bench section {next(unique)}").section_id
+
+    def new_product():
+        return ProductService.create_product(
+            section_id(), f"Bench product {next(unique)}", 1, 1, True
+        ).product_id
+
+    def new_product_name():
+        name = f"Purged product {next(unique)}"
+        ProductService.create_product(section_id(), name, 1, 1, True)
+        return name
+
+    def record_change(_):
+        ChangeService.record("product", "update", [product_id()])
+        db.session.commit()
+
+    etag = {}
+
+    def products_etag():
+        if "products" not in etag:
+            etag["products"] = client.get("/products").headers["ETag"]
+        return etag["products"]
+
+    def http(method, path, **kwargs):
+        def run(arg=None):
+            url = path(arg) if callable(path) else path
+            body = kwargs["json"](arg) if callable(kwargs.get("json")) else kwargs.get("json")
+            headers = kwargs["headers"](arg) if "headers" in kwargs else None
+            response = client.open(url, method=method, json=body, headers=headers)
+            response.get_data()
+            if response.status_code >= 500:
+                raise RuntimeError(f"{method} {url} returned {response.status_code}")
+        return run
+
+    def movements():
+        return [{"product_id": product_id(), "delta": 1} for _ in range(100)]
+
+    def product_ids():
+        return [product_id() for _ in range(100)]
+
+    bulk = [product_payload(1, f"Bulk {i}") for i in range(100)]
+    return [
+        Case("GET /", http("GET", "/"), route="GET /"),
+        Case("GET / (uncached)", http("GET", "/"), setup=service_cache.clear,
+             route="GET /"),
+        Case("GET /sections", http("GET", "/sections"), route="GET /sections"),
+        Case("GET /sections?limit=100", http("GET", "/sections?limit=100"),
+             route="GET /sections"),
+        Case("POST /sections/batch-get (100)",
+             http("POST", "/sections/batch-get",
+                  json=lambda _: {"ids": [section_id() for _ in range(100)]}),
+             route="POST /sections/batch-get"),
+        Case("GET /sections/<id>",
+             http("GET", lambda _: f"/sections/{section_id()}"),
+             route="GET /sections/<int:section_id>"),
+        Case("POST /sections",
+             http("POST", "/sections",
+                  json=lambda _: {"section_name": f"Posted {next(unique)}"}),
+             route="POST /sections"),
+        Case("PUT /sections/<id>",
+             http("PUT", lambda arg: f"/sections/{arg}",
+                  json=lambda _: {"section_name": f"Renamed {next(unique)}"}),
+             setup=new_section, route="PUT /sections/<int:section_id>"),
+        Case("PATCH /sections/<id>",
+             http("PATCH", lambda arg: f"/sections/{arg}",
+                  json=lambda _: {"section_name": f"Patched {next(unique)}"}),
+             setup=new_section, route="PATCH /sections/<int:section_id>"),
+        Case("DELETE /sections/<id>",
+             http("DELETE", lambda arg: f"/sections/{arg}"),
+             setup=new_section, route="DELETE /sections/<int:section_id>"),
+        Case("GET /sections/<id>/summary",
+             http("GET", lambda _: f"/sections/{section_id()}/summary"),
+             route="GET /sections/<int:section_id>/summary"),
+        Case("GET /inventory/summary", http("GET", "/inventory/summary"),
+             route="GET /inventory/summary"),
+        Case("GET /products", http("GET", "/products"), route="GET /products"),
+        Case("GET /products?limit=100", http("GET", "/products?limit=100"),
+             route="GET /products"),
+        Case("GET /products?fields=product_id,product_name",
+             http("GET", "/products?fields=product_id,product_name"),
+             route="GET /products"),
+        Case("GET /products?section_id=<id>&limit=100",
+             http("GET", lambda _: f"/products?section_id={section_id()}&limit=100"),
+             route="GET /products"),
+        Case("GET /products?max_quantity=5&sort=quantity_in_stock",
+             http("GET", "/products?max_quantity=5&sort=quantity_in_stock&limit=100"),
+             route="GET /products"),
+        Case("GET /products (304)",
+             http("GET", "/products", headers=lambda arg: {"If-None-Match": arg}),
+             setup=products_etag, route="GET /products"),
+        Case("GET /products/export", http("GET", "/products/export"),
+             route="GET /products/export"),
+        Case("GET /products/search?q=<name>",
+             http("GET", lambda _: f"/products/search?q=product+{product_id()}"),
+             route="GET /products/search"),
+        Case("GET /products/search?q=section (every row)",
+             http("GET", "/products/search?q=section"),
+             route="GET /products/search"),
+        Case("POST /products/batch-get (100)",
+             http("POST", "/products/batch-get", json=lambda _: {"ids": product_ids()}),
+             route="POST /products/batch-get"),
+        Case("GET /products/<id>",
+             http("GET", lambda _: f"/products/{product_id()}"),
+             route="GET /products/<int:product_id>"),
+        Case("POST /products",
+             http("POST", "/products",
+                  json=lambda _: product_payload(section_id(), f"Posted {next(unique)}")),
+             route="POST /products"),
+        Case("POST /products/bulk (100)",
+             http("POST", "/products/bulk?upsert=true", json=bulk),
+             route="POST /products/bulk"),
+        Case("POST /products/<id>/stock",
+             http("POST", lambda _: f"/products/{product_id()}/stock", json={"delta": 1}),
+             route="POST /products/<int:product_id>/stock"),
+        Case("POST /stock/movements (100)",
+             http("POST", "/stock/movements", json=lambda _: movements()),
+             route="POST /stock/movements"),
+        Case("PUT /products/<id>",
+             http("PUT", lambda arg: f"/products/{arg}",
+                  json=lambda _: product_payload(section_id(), f"Put {next(unique)}")),
+             setup=new_product, route="PUT /products/<int:product_id>"),
+        Case("PATCH /products/<id>",
+             http("PATCH", lambda _: f"/products/{product_id()}",
+                  json={"price_per_unit": 9}),
+             route="PATCH /products/<int:product_id>"),
+        Case("DELETE /products/<id>",
+             http("DELETE", lambda arg: f"/products/{arg}"),
+             setup=new_product, route="DELETE /products/<int:product_id>"),
+        Case("DELETE /products?name_prefix=<name>",
+             http("DELETE", lambda arg: f"/products?name_prefix={arg}"),
+             setup=new_product_name, route="DELETE /products"),
+        Case("GET /changes?limit=100", http("GET", "/changes?limit=100"),
+             route="GET /changes"),
+        Case("GET /cache/stats", http("GET", "/cache/stats"),
+             route="GET /cache/stats"),
+        Case("SectionService.get_all_sections",
+             lambda _: SectionService.get_all_sections(),
+             service="SectionService.get_all_sections"),
+        Case("SectionService.get_sections_page",
+             lambda _: SectionService.get_sections_page(100),
+             service="SectionService.get_sections_page"),
+        Case("SectionService.get_section_rows",
+             lambda _: SectionService.get_section_rows(SECTION_FIELDS),
+             service="SectionService.get_section_rows"),
+        Case("SectionService.get_sections_by_ids (100)",
+             lambda _: SectionService.get_sections_by_ids(
+                 [section_id() for _ in range(100)], SECTION_FIELDS),
+             service="SectionService.get_sections_by_ids"),
+        Case("SectionService.load_section_data",
+             lambda _: SectionService.load_section_data(section_id()),
+             service="SectionService.load_section_data"),
+        Case("SectionService.get_section_by_id",
+             lambda _: SectionService.get_section_by_id(section_id()),
+             service="SectionService.get_section_by_id"),
+        Case("SectionService.get_section_summary",
+             lambda _: SectionService.get_section_summary(section_id()),
+             service="SectionService.get_section_summary"),
+        Case("SectionService.get_section_summaries",
+             lambda _: SectionService.get_section_summaries(100),
+             service="SectionService.get_section_summaries"),
+        Case("SectionService.get_inventory_summary",
+             lambda _: SectionService.get_inventory_summary(),
+             service="SectionService.get_inventory_summary"),
+        Case("SectionService.check_section_stats",
+             lambda _: SectionService.check_section_stats(),
+             service="SectionService.check_section_stats"),
+        Case("SectionService.rebuild_section_stats",
+             lambda _: SectionService.rebuild_section_stats(),
+             service="SectionService.rebuild_section_stats"),
+        Case("SectionService.create_section",
+             lambda _: new_section(),
+             service="SectionService.create_section"),
+        Case("SectionService.update_section",
+             lambda arg: SectionService.update_section(arg, f"Updated {next(unique)}"),
+             setup=new_section, service="SectionService.update_section"),
+        Case("SectionService.patch_section",
+             lambda arg: SectionService.patch_section(
+                 arg, {"section_name": f"Patched {next(unique)}"}
+             ),
+             setup=new_section, service="SectionService.patch_section"),
+        Case("SectionService.delete_section",
+             lambda arg: SectionService.delete_section(arg),
+             setup=new_section, service="SectionService.delete_section"),
+        Case("ProductService.get_all_products",
+             lambda _: ProductService.get_all_products(),
+             service="ProductService.get_all_products"),
+        Case("ProductService.get_products_page",
+             lambda _: ProductService.get_products_page(100),
+             service="ProductService.get_products_page"),
+        Case("ProductService.get_product_rows",
+             lambda _: ProductService.get_product_rows(PRODUCT_FIELDS),
+             service="ProductService.get_product_rows"),
+        Case("ProductService.get_product_rows_page",
+             lambda _: ProductService.get_product_rows_page(PRODUCT_FIELDS, 100),
+             service="ProductService.get_product_rows_page"),
+        Case("ProductService.get_products_by_ids (100)",
+             lambda _: ProductService.get_products_by_ids(product_ids(), PRODUCT_FIELDS),
+             service="ProductService.get_products_by_ids"),
+        Case("ProductService.iter_all_products",
+             lambda _: sum(1 for _ in ProductService.iter_all_products()),
+             service="ProductService.iter_all_products"),
+        Case("ProductService.search_products",
+             lambda _: ProductService.search_products(["product", str(product_id())], 20),
+             service="ProductService.search_products"),
+        Case("ProductService.get_product_by_id",
+             lambda _: ProductService.get_product_by_id(product_id()),
+             service="ProductService.get_product_by_id"),
+        Case("ProductService.create_product",
+             lambda _: new_product(),
+             service="ProductService.create_product"),
+        Case("ProductService.bulk_create_products (100)",
+             lambda _: ProductService.bulk_create_products(bulk, upsert=True),
+             service="ProductService.bulk_create_products"),
+        Case("ProductService.move_stock",
+             lambda _: ProductService.move_stock(product_id(), 1),
+             service="ProductService.move_stock"),
+        Case("ProductService.move_stock_batch (100)",
+             lambda _: ProductService.move_stock_batch(movements()),
+             service="ProductService.move_stock_batch"),
+        Case("ProductService.update_product",
+             lambda arg: ProductService.update_product(
+                 arg, section_id(), f"Updated {next(unique)}", 1, 1, True
+             ),
+             setup=new_product, service="ProductService.update_product"),
+        Case("ProductService.patch_product",
+             lambda _: ProductService.patch_product(product_id(), {"price_per_unit": 9}),
+             service="ProductService.patch_product"),
+        Case("ProductService.delete_product",
+             lambda arg: ProductService.delete_product(arg),
+             setup=new_product, service="ProductService.delete_product"),
+        Case("ProductService.delete_products",
+             lambda arg: ProductService.delete_products({"name_prefix": arg}),
+             setup=new_product_name, service="ProductService.delete_products"),
+        Case("ProductService.delete_products (chunked)",
+             lambda arg: ProductService.delete_products({"name_prefix": arg}, 100),
+             setup=new_product_name, service="ProductService.delete_products"),
+        Case("ChangeService.record", record_change, service="ChangeService.record"),
+        Case("ChangeService.get_changes",
+             lambda _: ChangeService.get_changes(0, 100),
+             service="ChangeService.get_changes"),
+        Case("ChangeService.get_last_seq",
+             lambda _: ChangeService.get_last_seq(),
+             service="ChangeService.get_last_seq"),
+        Case("ChangeService.compact",
+             lambda _: ChangeService.compact(ChangeService.get_last_seq()),
+             service="ChangeService.compact"),
+    ]
+
+
+def report_uncovered(app, cases):
+    """
+    Warn about routes and service methods that have no benchmark case.
+    """
+    covered_routes = {case.route for case in cases if case.route}
+    for rule in app.url_map.iter_rules():
+        if not rule.endpoint.startswith("main."):
+            continue
+        for method in sorted(rule.methods - {"HEAD", "OPTIONS"}):
+            if f"{method} {rule.rule}" not in covered_routes:
+                print(f"warning: no benchmark for {method} {rule.rule}", file=sys.stderr)
+
+    covered_services = {case.service for case in cases if case.service}
+    for cls in (ChangeService, SectionService, ProductService):
+        for name, value in vars(cls).items():
+            if isinstance(value, staticmethod) and f"{cls.__name__}.{name}" not in covered_services:
+                print(f"warning: no benchmark for {cls.__name__}.{name}", file=sys.stderr)
+
+
+def percentile(sorted_values, fraction):
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def measure(case, iterations, case_seconds):
+    latencies = []
+    elapsed = 0.0
+    while len(latencies) < iterations and (not latencies or elapsed < case_seconds):
+        arg = case.setup() if case.setup else None
+        started = time.perf_counter()
+        case.run(arg)
+        latencies.append(time.perf_counter() - started)
+        elapsed += latencies[-1]
+        db.session.remove()
+    latencies.sort()
+    return {
+        "runs": len(latencies),
+        "ops_per_sec": len(latencies) / sum(latencies),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def reset_database(template, path):
+    """
+    Replace the database at `path` with a copy of the seeded `template`.
+    """
+    db.session.remove()
+    db.engine.dispose()
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    shutil.copyfile(template, path)
+    service_cache.clear()
+
+
+def combine(measurements):
+    """
+    Median of each statistic over the repeats of a case, plus the spread
+    (max - min) of p50 and p95 between repeats.
+    """
+    combined = {
+        key: statistics.median(measurement[key] for measurement in measurements)
+        for key in measurements[0]
+    }
+    for metric in ("p50", "p95"):
+        values = [measurement[f"{metric}_ms"] for measurement in measurements]
+        combined[f"{metric}_spread_ms"] = max(values) - min(values)
+    return combined
+
+
+def run_size(size, iterations, case_seconds, selected, repeats):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "bench.db")
+    template = os.path.join(directory, "seeded.db")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+    results = {}
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        sections = seed(db.engine, size)
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        db.engine.dispose()
+        shutil.copyfile(path, template)
+        print(f"\n{size} products in {sections} sections, seeded in "
+              f"{time.perf_counter() - started:.1f} s")
+        cases = build_cases(app, size, sections)
+        report_uncovered(app, cases)
+        cases = [
+            case for case in cases
+            if not selected or any(pattern in case.name for pattern in selected)
+        ]
+        measurements = {case.name: [] for case in cases}
+        for _ in range(repeats):
+            for case in cases:
+                reset_database(template, path)
+                measurements[case.name].append(measure(case, iterations, case_seconds))
+        for case in cases:
+            results[case.name] = stats = combine(measurements[case.name])
+            print(f"  {case.name:46} {stats['ops_per_sec']:9.1f}/s  "
+                  f"p50 {stats['p50_ms']:9.2f}  p95 {stats['p95_ms']:9.2f}  "
+                  f"p99 {stats['p99_ms']:9.2f} ms  "
+                  f"(p50 spread {stats['p50_spread_ms']:.2f} ms)")
+        db.engine.dispose()
+    shutil.rmtree(directory)
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms, noise_factor):
+    regressions = []
+    for size, cases in results.items():
+        for name, stats in cases.items():
+            previous = baseline.get(size, {}).get(name)
+            if previous is None:
+                continue
+            for metric in ("p50", "p95"):
+                noise = max(
+                    previous.get(f"{metric}_spread_ms", 0.0),
+                    stats[f"{metric}_spread_ms"],
+                )
+                allowed = max(
+                    previous[f"{metric}_ms"] * threshold,
+                    min_delta_ms,
+                    noise * noise_factor,
+                )
+                slower_by = stats[f"{metric}_ms"] - previous[f"{metric}_ms"]
+                if slower_by > allowed:
+                    regressions.append(
+                        f"{size} products, {name}: {metric} {stats[f'{metric}_ms']:.2f} ms "
+                        f"vs baseline {previous[f'{metric}_ms']:.2f} ms "
+                        f"(allowed +{allowed:.2f} ms)"
+                    )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", default="1000",
+                        help="comma-separated catalogue sizes, e.g. 1000,100000,1000000")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--case-seconds", type=float, default=2.0)
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="runs of the whole suite, each case reports the median")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="allowed slowdown against the baseline, 0.5 = 50%%")
+    parser.add_argument("--min-delta-ms", type=float, default=0.2,
+                        help="ignore slowdowns smaller than this, for microsecond cases")
+    parser.add_argument("--noise-factor", type=float, default=2.0,
+                        help="also ignore slowdowns within this many repeat spreads")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="record the cases missing from the baseline")
+    parser.add_argument("--overwrite-baseline", action="store_true",
+                        help="with --update-baseline, also replace existing entries")
+    parser.add_argument("--only", action="append", default=[],
+                        help="run only cases whose name contains this text")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    results = {
+        size: run_size(
+            int(size), args.iterations, args.case_seconds, args.only, args.repeats
+        )
+        for size in args.sizes.split(",")
+    }
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        added = 0
+        for size, cases in results.items():
+            recorded = baseline.setdefault(size, {})
+            for name, stats in cases.items():
+                if args.overwrite_baseline or name not in recorded:
+                    recorded[name] = stats
+                    added += 1
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\n{added} cases written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}, run with --update-baseline first")
+        return
+    with open(args.baseline) as f:
+        regressions = compare(
+            results, json.load(f), args.threshold, args.min_delta_ms, args.noise_factor
+        )
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\nNo regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import argparse
+
+from sqlalchemy import inspect
+
+from app import create_app
+from app.models import db
+from app.services import SectionService
+
+parser = argparse.ArgumentParser(
+    description="Compare the section_stats counters with the products table."
+)
+parser.add_argument(
+    "--rebuild",
+    action="store_true",
+    help="recompute every section's counters when any of them drifted",
+)
+args = parser.parse_args()
+
+app = create_app()
+
+with app.app_context():
+    if db.engine.dialect.name != "sqlite":
+        raise SystemExit("Section stats are only maintained on SQLite")
+    if not inspect(db.engine).has_table("section_stats"):
+        raise SystemExit("No section_stats table, run migrate_db.py first")
+
+    drifted = SectionService.check_section_stats()
+    for section in drifted:
+        print(
+            f"Section {section['section_id']}: stored {section['stored']}, "
+            f"expected {section['expected']}"
+        )
+    if not drifted:
+        print("Section stats match the products table")
+    elif args.rebuild:
+        count = SectionService.rebuild_section_stats()
+        print(f"Section stats rebuilt for {count} sections")
+    else:
+        raise SystemExit(f"{len(drifted)} sections drifted, run with --rebuild to fix them")
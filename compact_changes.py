@@ -0,0 +1,22 @@
+import argparse
+
+from app import create_app
+from app.services import ChangeService
+
+parser = argparse.ArgumentParser(
+    description="Delete change log entries superseded by a later change to the same row."
+)
+parser.add_argument(
+    "--keep-last",
+    type=int,
+    default=0,
+    help="leave the newest N entries untouched, so recent history stays complete",
+)
+args = parser.parse_args()
+
+app = create_app()
+
+with app.app_context():
+    before_seq = ChangeService.get_last_seq() - args.keep_last
+    deleted = ChangeService.compact(before_seq)
+    print(f"Compacted {deleted} changes up to seq {before_seq}")
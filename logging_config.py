@@ -1,10 +1,10 @@
 import os
+import atexit
+import queue
+import random
 import logging
 import logging.config
-
-
-if not os.path.exists('logs'):
-    os.makedirs('logs')
+from logging.handlers import QueueHandler, QueueListener
 
 
 LOGGING = {
@@ -32,6 +32,12 @@ LOGGING = {
             'filename': 'logs/service.log',
             'mode': 'a',
         },
+        'perf_file': {
+            'class': 'logging.FileHandler',
+            'formatter': 'default',
+            'filename': 'logs/perf.log',
+            'mode': 'a',
+        },
     },
     'loggers': {
         'controller_logger': {
@@ -44,7 +50,86 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': False,
         },
+        'perf_logger': {
+            'handlers': ['console', 'perf_file'],
+            'level': 'DEBUG',
+            'propagate': False,
+        },
     },
 }
 
-logging.config.dictConfig(LOGGING)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue the record with its message merged with its args, which may be
+    mutable objects the caller changes right after logging. The stock
+    QueueHandler also runs the formatter on the calling thread; here the
+    timestamp and layout are left to the listener thread.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Let through only `rate` (0-1) of records below WARNING.
+    """
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+_listeners = []
+
+
+def stop_listeners():
+    while _listeners:
+        _listeners.pop().stop()
+
+
+def configure_logging(use_queue=None, level=None, sample_rate=None):
+    """
+    Apply LOGGING, optionally moving the handlers onto a background thread.
+
+    Each argument defaults to an environment variable: LOG_QUEUE (1 to enable
+    the queue), LOG_LEVEL (e.g. INFO) and LOG_SAMPLE_RATE (fraction of info
+    and debug lines to keep).
+    """
+    if use_queue is None:
+        use_queue = os.environ.get("LOG_QUEUE", "0") == "1"
+    if level is None:
+        level = os.environ.get("LOG_LEVEL", "DEBUG")
+    if sample_rate is None:
+        sample_rate = float(os.environ.get("LOG_SAMPLE_RATE", "1"))
+
+    stop_listeners()
+    os.makedirs('logs', exist_ok=True)
+    logging.config.dictConfig(LOGGING)
+
+    for name in LOGGING['loggers']:
+        logger = logging.getLogger(name)
+        logger.setLevel(level)
+        for log_filter in list(logger.filters):
+            if isinstance(log_filter, SamplingFilter):
+                logger.removeFilter(log_filter)
+        if sample_rate < 1:
+            logger.addFilter(SamplingFilter(sample_rate))
+        if use_queue:
+            log_queue = queue.SimpleQueue()
+            listener = QueueListener(
+                log_queue, *logger.handlers, respect_handler_level=True
+            )
+            logger.handlers = [DeferredQueueHandler(log_queue)]
+            listener.start()
+            _listeners.append(listener)
+
+
+atexit.register(stop_listeners)
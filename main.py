@@ -1,13 +1,41 @@
-import logging.config
-from logging_config import LOGGING
+import argparse
+
+from logging_config import configure_logging
 
 from app import create_app
 from app.controllers import main
 
 
-logging.config.dictConfig(LOGGING)
+configure_logging()
 app = create_app()
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Warehouse API")
+    commands = parser.add_subparsers(dest="command")
+    serve = commands.add_parser(
+        "serve", help="production server with prefork worker processes"
+    )
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--workers", type=int, default=None,
+                       help="worker processes, defaults to the CPU count")
+    serve.add_argument("--graceful-timeout", type=float, default=30,
+                       help="seconds a worker gets to finish before it is killed")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    app.run(debug=True)
+    args = parse_args()
+    if args.command == "serve":
+        from server import PreforkServer
+
+        PreforkServer(
+            app,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            graceful_timeout=args.graceful_timeout,
+        ).run()
+    else:
+        app.run(debug=True)
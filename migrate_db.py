@@ -0,0 +1,123 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import AddConstraint, CreateTable
+
+from app import create_app
+from app.services import SectionService
+from app.models import (
+    db,
+    Section,
+    Product,
+    TableVersion,
+    DATABASE_EPOCH,
+    PRODUCT_SEARCH_DDL,
+    SECTION_STATS_DDL,
+    new_database_epoch,
+)
+
+
+def section_foreign_key(connection):
+    for foreign_key in inspect(connection).get_foreign_keys("products"):
+        if foreign_key["referred_table"] == "sections":
+            return foreign_key
+    return None
+
+
+def rebuild_sqlite_products(connection):
+    """
+    SQLite cannot alter a foreign key, so copy products into a table created
+    from the current model and swap it in, as the SQLite ALTER TABLE docs
+    describe. Row IDs are kept, so products_fts stays valid. The copy and
+    the DROP fire no triggers, so the section_stats counters are untouched.
+    """
+    metadata = db.MetaData()
+    Section.__table__.to_metadata(metadata)
+    new_table = Product.__table__.to_metadata(metadata, name="products_new")
+    columns = ", ".join(column.name for column in Product.__table__.columns)
+    connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+    connection.commit()
+    try:
+        with connection.begin():
+            connection.exec_driver_sql("DROP TABLE IF EXISTS products_new")
+            connection.execute(CreateTable(new_table))
+            connection.exec_driver_sql(
+                f"INSERT INTO products_new ({columns}) SELECT {columns} FROM products"
+            )
+            # Recreated below, SQLite rejects the rename while a trigger on
+            # sections refers to a missing products table.
+            connection.exec_driver_sql("DROP TRIGGER IF EXISTS sections_fts_rename")
+            connection.exec_driver_sql("DROP TABLE products")
+            connection.exec_driver_sql("ALTER TABLE products_new RENAME TO products")
+            for index in Product.__table__.indexes:
+                index.create(bind=connection)
+            for statement in PRODUCT_SEARCH_DDL + SECTION_STATS_DDL:
+                connection.execute(text(statement))
+    finally:
+        connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+        connection.commit()
+
+
+def add_section_cascade():
+    with db.engine.connect() as connection:
+        foreign_key = section_foreign_key(connection)
+        if foreign_key and foreign_key["options"].get("ondelete", "").upper() == "CASCADE":
+            print("ON DELETE CASCADE on products.section_id is in place")
+            return
+
+        orphans = connection.execute(
+            text(
+                "SELECT count(*) FROM products WHERE section_id NOT IN "
+                "(SELECT section_id FROM sections)"
+            )
+        ).scalar()
+        if orphans:
+            raise SystemExit(
+                f"Cannot add ON DELETE CASCADE: {orphans} products reference missing "
+                "sections. Delete them and run this script again."
+            )
+
+        if connection.dialect.name == "sqlite":
+            rebuild_sqlite_products(connection)
+        else:
+            constraint = next(
+                constraint
+                for constraint in Product.__table__.foreign_key_constraints
+                if constraint.referred_table.name == "sections"
+            )
+            with connection.begin():
+                if foreign_key:
+                    connection.exec_driver_sql(
+                        f"ALTER TABLE products DROP CONSTRAINT {foreign_key['name']}"
+                    )
+                connection.execute(AddConstraint(constraint))
+        print("Added ON DELETE CASCADE to products.section_id")
+
+
+app = create_app()
+
+with app.app_context():
+    had_section_stats = inspect(db.engine).has_table("section_stats")
+    db.create_all()
+
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=db.engine, checkfirst=True)
+            except IntegrityError:
+                raise SystemExit(
+                    f"Cannot create {index.name}: {table.name} contains duplicate "
+                    f"rows for ({', '.join(column.name for column in index.columns)}). "
+                    "Remove the duplicates and run this script again."
+                )
+            print(f"Index {index.name} on {table.name} is in place")
+
+    add_section_cascade()
+
+    if db.session.get(TableVersion, DATABASE_EPOCH) is None:
+        db.session.add(TableVersion(table_name=DATABASE_EPOCH, version=new_database_epoch()))
+        db.session.commit()
+        print("Database epoch added to table_versions")
+
+    if db.engine.dialect.name == "sqlite" and not had_section_stats:
+        count = SectionService.rebuild_section_stats()
+        print(f"Section stats computed for {count} sections")
@@ -0,0 +1,28 @@
+from sqlalchemy import text
+
+from app import create_app
+from app.models import db, PRODUCT_SEARCH_DDL
+
+app = create_app()
+
+with app.app_context():
+    if db.engine.dialect.name != "sqlite":
+        raise SystemExit("The search index is only maintained on SQLite")
+
+    db.create_all()
+    for statement in PRODUCT_SEARCH_DDL:
+        db.session.execute(text(statement))
+
+    db.session.execute(text("DELETE FROM products_fts"))
+    db.session.execute(
+        text(
+            "INSERT INTO products_fts (rowid, product_name, section_name) "
+            "SELECT products.product_id, products.product_name, sections.section_name "
+            "FROM products JOIN sections ON sections.section_id = products.section_id"
+        )
+    )
+    db.session.execute(text("INSERT INTO products_fts (products_fts) VALUES ('optimize')"))
+    db.session.commit()
+
+    count = db.session.execute(text("SELECT count(*) FROM products_fts")).scalar()
+    print(f"Search index rebuilt with {count} products")
@@ -0,0 +1,234 @@
+"""
+Prefork production server.
+
+The master opens one listening socket and forks worker processes that all
+accept from it. The app is created once in the master, before the fork;
+each worker then disposes of the inherited engine so it opens its own
+database connections, and reconfigures logging so its handlers and queue
+listener belong to the worker. With more than one worker, the service
+cache is turned off unless its backend is shared between processes, since
+a worker would otherwise keep serving entries another worker's write made
+stale.
+
+Signals sent to the master:
+
+- SIGTERM, SIGINT: stop accepting, let workers finish their current request
+  and exit.
+- SIGHUP: start a new set of workers, then gracefully stop the old ones.
+
+A worker whose master dies, even by SIGKILL, notices within
+PARENT_CHECK_INTERVAL seconds and stops gracefully too.
+"""
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+from logging_config import configure_logging
+from app import db
+from app.cache import NullCache
+from app.services import configure_cache, service_cache
+
+
+server_logger = logging.getLogger('controller_logger')
+
+# Seconds between a worker's checks that its master is still running.
+PARENT_CHECK_INTERVAL = 1.0
+
+
+def create_listening_socket(host, port, backlog=2048):
+    """
+    Non-blocking listening socket shared by every worker. Workers that lose
+    the race for a connection get EAGAIN and go back to waiting.
+    """
+    listener = socket.create_server((host, port), backlog=backlog)
+    listener.setblocking(False)
+    listener.set_inheritable(True)
+    return listener
+
+
+def run_worker(app, listener, master_pid):
+    """
+    Serve requests from `listener` until SIGTERM, or until the master exits.
+    Runs in a forked child.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    # Connections in the inherited pool belong to the master. close=False
+    # leaves them open for the master and only drops our references.
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    configure_logging()
+
+    host, port = listener.getsockname()[:2]
+    server = make_server(host, port, app, fd=listener.fileno())
+
+    def shut_down(signum, frame):
+        # shutdown() blocks until serve_forever returns, so it needs its own
+        # thread; the request in progress finishes first.
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, shut_down)
+
+    # An orphaned worker would keep accepting from the shared socket, so
+    # stop once the master is gone and this process has been reparented.
+    stopped = threading.Event()
+
+    def watch_master():
+        while not stopped.wait(PARENT_CHECK_INTERVAL):
+            if os.getppid() != master_pid:
+                server_logger.warning("Master %s exited, worker %s stopping",
+                                      master_pid, os.getpid())
+                server.shutdown()
+                return
+
+    threading.Thread(target=watch_master, daemon=True).start()
+    server_logger.info("Worker %s serving on %s:%s", os.getpid(), host, port)
+    try:
+        server.serve_forever(poll_interval=0.5)
+    finally:
+        stopped.set()
+    server_logger.info("Worker %s stopped", os.getpid())
+
+
+class PreforkServer:
+    def __init__(self, app, host="127.0.0.1", port=8000, workers=None,
+                 graceful_timeout=30):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.worker_count = workers or os.cpu_count() or 1
+        self.graceful_timeout = graceful_timeout
+        self.listener = None
+        self.workers = {}
+        self.generation = 0
+        self.signals = []
+        self.master_pid = None
+
+    def check_cache(self):
+        if self.worker_count > 1 and not service_cache.backend.shared:
+            server_logger.warning(
+                "%s is per process, turning the service cache off for %s workers",
+                type(service_cache.backend).__name__,
+                self.worker_count,
+            )
+            configure_cache(NullCache())
+
+    def spawn_worker(self):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                run_worker(self.app, self.listener, self.master_pid)
+            except BaseException:
+                server_logger.exception("Worker %s crashed", os.getpid())
+                status = 1
+            finally:
+                logging.shutdown()
+                os._exit(status)
+        self.workers[pid] = self.generation
+        return pid
+
+    def spawn_generation(self):
+        self.generation += 1
+        for _ in range(self.worker_count):
+            self.spawn_worker()
+
+    def stop_workers(self, pids):
+        """
+        SIGTERM `pids`, wait up to graceful_timeout for them to exit and
+        SIGKILL any that are still running.
+        """
+        for pid in pids:
+            self.signal_worker(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        remaining = set(pids)
+        while remaining and time.monotonic() < deadline:
+            remaining -= self.reap()
+            time.sleep(0.05)
+        for pid in remaining:
+            server_logger.warning("Worker %s did not stop in time, killing it", pid)
+            self.signal_worker(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self.workers.pop(pid, None)
+
+    def signal_worker(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def reap(self):
+        """
+        Collect exited workers and return their PIDs.
+        """
+        exited = set()
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            self.workers.pop(pid, None)
+            exited.add(pid)
+        return exited
+
+    def reload(self):
+        old = list(self.workers)
+        self.spawn_generation()
+        server_logger.info(
+            "Reloading: started %s workers, stopping %s", self.worker_count, len(old)
+        )
+        self.stop_workers(old)
+
+    def run(self):
+        if not hasattr(os, "fork"):
+            raise RuntimeError("The prefork server needs os.fork, use Linux or macOS")
+        self.master_pid = os.getpid()
+        self.listener = create_listening_socket(self.host, self.port)
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, lambda signum, frame: self.signals.append(signum))
+
+        self.check_cache()
+        # Close pooled connections before forking so no worker inherits one.
+        with self.app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+        self.spawn_generation()
+        server_logger.info(
+            "Master %s listening on %s:%s with %s workers",
+            os.getpid(),
+            self.host,
+            self.port,
+            self.worker_count,
+        )
+
+        try:
+            while True:
+                while self.signals:
+                    signum = self.signals.pop(0)
+                    if signum == signal.SIGHUP:
+                        self.reload()
+                    else:
+                        return
+                for pid in self.reap():
+                    server_logger.warning("Worker %s exited unexpectedly", pid)
+                # Keep the current generation at full strength.
+                current = sum(
+                    1 for generation in self.workers.values()
+                    if generation == self.generation
+                )
+                for _ in range(self.worker_count - current):
+                    self.spawn_worker()
+                time.sleep(0.2)
+        finally:
+            server_logger.info("Shutting down %s workers", len(self.workers))
+            self.stop_workers(list(self.workers))
+            self.listener.close()
@@ -1,13 +1,15 @@
 import pytest
+from sqlalchemy import event
 from app import create_app
-from app.models import db, Section, Product
+from app.models import db, Change, Section, Product
+from app.services import service_cache
 
 @pytest.fixture(scope='module')
 def app():
-    app = create_app()
-    app.config.update({
+    app = create_app({
         "TESTING": True,
-        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "INSTRUMENTATION_ENABLED": True,
     })
 
     with app.app_context():
@@ -22,6 +24,7 @@ def client(app):
 
 @pytest.fixture(scope='function', autouse=True)
 def setup_database(app):
+    service_cache.clear()
     with app.app_context():
         section1 = Section(section_name="Electronics")
         section2 = Section(section_name="Food and Drinks")
@@ -63,4 +66,17 @@ def setup_database(app):
 
         db.session.query(Product).delete()
         db.session.query(Section).delete()
+        db.session.query(Change).delete()
         db.session.commit()
+
+@pytest.fixture(scope='function')
+def query_counter(app):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        yield statements
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,36 @@
+from app.cache import LRUCache, ReadThroughCache
+
+def test_fill_is_dropped_when_invalidated_during_load():
+    cache = ReadThroughCache(LRUCache())
+
+    def load():
+        # A write commits and invalidates the key while the row is read.
+        cache.invalidate('product:1')
+        return {'product_name': 'Old'}
+
+    assert cache.get_or_load('product:1', load) == {'product_name': 'Old'}
+    assert cache.backend.get('product:1') is None
+    assert cache.get_or_load('product:1', lambda: {'product_name': 'New'}) == {'product_name': 'New'}
+    assert cache.backend.get('product:1') == {'product_name': 'New'}
+
+def test_side_fill_is_dropped_when_invalidated_during_load():
+    cache = ReadThroughCache(LRUCache())
+
+    def load():
+        since = cache.sequence
+        cache.invalidate('section:1')
+        cache.set('section:1', {'section_name': 'Old'}, since)
+        cache.set('section:2', {'section_name': 'Kept'}, since)
+        return {'section_id': 1}
+
+    cache.get_or_load('product:1', load)
+    assert cache.backend.get('section:1') is None
+    assert cache.backend.get('section:2') == {'section_name': 'Kept'}
+    assert cache.backend.get('product:1') == {'section_id': 1}
+
+def test_invalidations_are_forgotten_between_loads():
+    cache = ReadThroughCache(LRUCache())
+    cache.get_or_load('product:1', lambda: cache.invalidate('product:2') or {'id': 1})
+    assert cache._invalidated == {}
+    assert cache.get_or_load('product:2', lambda: {'id': 2}) == {'id': 2}
+    assert cache.backend.get('product:2') == {'id': 2}
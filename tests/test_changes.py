@@ -0,0 +1,122 @@
+from app.models import db, Change
+from app.services import ChangeService
+
+def feed(client, since=0, limit=1000):
+    response = client.get(f'/changes?since={since}&limit={limit}')
+    assert response.status_code == 200
+    return response.get_json()
+
+def entries(client, since=0):
+    return [(c['entity'], c['id'], c['op']) for c in feed(client, since)['changes']]
+
+def test_changes_empty(client):
+    data = feed(client)
+    assert data == {'changes': [], 'next_since': 0, 'last_seq': data['last_seq'], 'has_more': False}
+
+def test_every_write_is_recorded(client):
+    since = feed(client)['last_seq']
+    section_id = client.post('/sections', json={'section_name': 'Books'}).get_json()['section_id']
+    client.patch(f'/sections/{section_id}', json={'section_name': 'Novels'})
+    product_id = client.post('/products', json={
+        'section_id': section_id,
+        'product_name': 'Dune',
+        'quantity_in_stock': 5,
+        'price_per_unit': 10,
+        'is_product_available': True,
+    }).get_json()['product_id']
+    client.post(f'/products/{product_id}/stock', json={'delta': -1})
+    client.post('/stock/movements', json=[{'product_id': 1, 'delta': 1}, {'product_id': 999, 'delta': 1}])
+    client.delete('/products/2')
+    client.delete('/products?max_price=1')
+    client.delete(f'/sections/{section_id}')
+    assert entries(client, since) == [
+        ('section', section_id, 'create'),
+        ('section', section_id, 'update'),
+        ('product', product_id, 'create'),
+        ('product', product_id, 'update'),
+        ('product', 1, 'update'),
+        ('product', 2, 'delete'),
+        ('product', 4, 'delete'),
+        ('product', product_id, 'delete'),
+        ('section', section_id, 'delete'),
+    ]
+
+def test_bulk_upsert_is_recorded(client):
+    since = feed(client)['last_seq']
+    response = client.post('/products/bulk?upsert=true', json=[
+        {'section_id': 1, 'product_name': 'Tablet', 'quantity_in_stock': 1,
+         'price_per_unit': 300, 'is_product_available': True},
+        {'section_id': 1, 'product_name': 'Laptop', 'quantity_in_stock': 1,
+         'price_per_unit': 300, 'is_product_available': True},
+    ])
+    tablet_id = response.get_json()['results'][0]['product_id']
+    assert entries(client, since) == [('product', tablet_id, 'create'), ('product', 1, 'update')]
+
+def test_failed_write_is_not_recorded(client):
+    since = feed(client)['last_seq']
+    assert client.post('/sections', json={'section_name': 'Electronics'}).status_code == 400
+    assert client.post('/products/1/stock', json={'delta': -1000}).status_code == 409
+    assert feed(client, since)['changes'] == []
+
+def test_changes_carry_current_rows_and_tombstones(client):
+    since = feed(client)['last_seq']
+    client.patch('/products/3', json={'quantity_in_stock': 90})
+    client.patch('/products/4', json={'quantity_in_stock': 1})
+    client.delete('/products/4')
+    changes = feed(client, since)['changes']
+    assert changes[0]['data'] == client.get('/products/3').get_json()
+    assert changes[1]['data'] is None
+    assert (changes[2]['op'], changes[2]['data']) == ('delete', None)
+    assert changes[0]['seq'] < changes[1]['seq'] < changes[2]['seq']
+
+def test_changes_paginate(client):
+    since = feed(client)['last_seq']
+    for delta in (1, 2, 3):
+        client.post('/products/1/stock', json={'delta': delta})
+    first = feed(client, since, limit=2)
+    assert (len(first['changes']), first['has_more']) == (2, True)
+    second = feed(client, first['next_since'], limit=2)
+    assert (len(second['changes']), second['has_more']) == (1, False)
+    assert second['next_since'] == second['last_seq']
+    assert feed(client, second['next_since'])['changes'] == []
+
+def test_changes_etag(client):
+    response = client.get('/changes')
+    etag = response.headers['ETag']
+    assert client.get('/changes', headers={'If-None-Match': etag}).status_code == 304
+    client.post('/products/1/stock', json={'delta': 1})
+    assert client.get('/changes', headers={'If-None-Match': etag}).status_code == 200
+
+def test_changes_invalid_args(client):
+    assert client.get('/changes?since=-1').status_code == 400
+    assert client.get('/changes?since=abc').status_code == 400
+    assert client.get('/changes?since=99999999999999999999999').status_code == 400
+    assert client.get(f'/changes?since={2**63 - 1}').status_code == 200
+    assert client.get('/changes?limit=0').status_code == 400
+
+def test_compaction_keeps_the_latest_change_per_row(app, client):
+    since = feed(client)['last_seq']
+    client.patch('/products/1', json={'price_per_unit': 900})
+    client.patch('/products/2', json={'price_per_unit': 400})
+    client.patch('/products/1', json={'price_per_unit': 800})
+    client.delete('/products/2')
+    client.post('/products/3/stock', json={'delta': 1})
+    last_seq = feed(client)['last_seq']
+    with app.app_context():
+        assert ChangeService.compact(last_seq) == 2
+        assert db.session.query(Change).count() == 3
+    assert entries(client, since) == [
+        ('product', 1, 'update'),
+        ('product', 2, 'delete'),
+        ('product', 3, 'update'),
+    ]
+    assert feed(client, since)['changes'][0]['data']['price_per_unit'] == 800
+    assert feed(client)['last_seq'] == last_seq
+
+def test_compaction_respects_before_seq(app, client):
+    client.post('/products/1/stock', json={'delta': 1})
+    before = feed(client)['last_seq']
+    client.post('/products/1/stock', json={'delta': 1})
+    with app.app_context():
+        assert ChangeService.compact(before - 1) == 0
+        assert ChangeService.compact(before) == 1
@@ -1,15 +1,361 @@
+import json
+import time
+import pytest
+from sqlalchemy import text
+from app.cache import LRUCache, NullCache
+from app.controllers import home_page_cache
+from app.models import db, Product, TableVersion
+from app.filtering import PRODUCT_FIELDS
+from app.pagination import encode_cursor
+from app.services import (
+    ProductService,
+    filtered_products_query,
+    prefix_upper_bound,
+    rows_to_dicts,
+    section_cache_key,
+    configure_cache,
+    service_cache,
+)
+
 def test_get_all_products(client):
     response = client.get('/products')
     assert response.status_code == 200
     data = response.get_json()
     assert len(data) == 4  
 
+def test_get_all_products_query_count_is_constant(app, client, query_counter):
+    client.get('/products')
+    baseline = len(query_counter)
+
+    with app.app_context():
+        db.session.add_all([
+            Product(
+                section_id=1,
+                product_name=f'Cable {i}',
+                quantity_in_stock=10,
+                price_per_unit=5,
+                is_product_available=True,
+            )
+            for i in range(20)
+        ])
+        db.session.commit()
+
+    query_counter.clear()
+    response = client.get('/products')
+    assert len(response.get_json()) == 24
+    assert len(query_counter) == baseline
+
+def test_get_product_loads_section_in_one_query(client, query_counter):
+    response = client.get('/products/2')
+    assert response.get_json()['section'] == 'Electronics'
+    assert len(query_counter) == 1
+
+def test_get_products_server_timing(client):
+    timing = client.get('/products').headers['Server-Timing']
+    names = [metric.split(';')[0] for metric in timing.split(', ')]
+    assert names == ['db', 'validation', 'service', 'serialization', 'total']
+    assert 'desc="2 queries"' in timing
+
+def test_query_timing_after_failed_statement(app, client):
+    response = client.post('/products', json={
+        'section_id': 1,
+        'product_name': 'Laptop',
+        'quantity_in_stock': 30,
+        'price_per_unit': 300,
+        'is_product_available': True,
+    })
+    assert response.status_code == 400
+    time.sleep(0.2)
+    timing = client.get('/products').headers['Server-Timing']
+    db_ms = float(timing.split(', ')[0].split(';')[1].removeprefix('dur='))
+    assert db_ms < 200
+    with app.app_context(), db.engine.connect() as connection:
+        assert not connection.info.get('query_started')
+
+def test_get_products_not_modified(client, query_counter):
+    etag = client.get('/products').headers['ETag']
+    query_counter.clear()
+    response = client.get('/products', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert len(query_counter) == 1
+    assert 'FROM table_versions' in query_counter[0]
+
+def test_get_products_etag_changes_with_database(app, client):
+    etag = client.get('/products').headers['ETag']
+    with app.app_context():
+        counters = dict(db.session.query(TableVersion.table_name, TableVersion.version))
+        db.session.remove()
+        TableVersion.__table__.drop(db.engine)
+        TableVersion.__table__.create(db.engine)
+        for name in ('sections', 'products'):
+            db.session.get(TableVersion, name).version = counters[name]
+        db.session.commit()
+    response = client.get('/products', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+
+def test_get_products_etag_changes_on_write(client):
+    etag = client.get('/products').headers['ETag']
+    client.delete('/products/4')
+    response = client.get('/products', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert len(response.get_json()) == 3
+
+def test_get_products_paginated(client):
+    response = client.get('/products?limit=3')
+    assert response.status_code == 200
+    assert [p['product_id'] for p in response.get_json()] == [1, 2, 3]
+
+    next_url = response.headers['Link'].split(';')[0].strip('<>')
+    response = client.get(next_url)
+    assert [p['product_id'] for p in response.get_json()] == [4]
+    assert 'Link' not in response.headers
+
+def test_get_products_invalid_page_args(client):
+    assert client.get('/products?limit=0').status_code == 400
+    assert client.get('/products?cursor=not-a-cursor').status_code == 400
+
+@pytest.mark.parametrize('sort, position', [
+    ('product_name', [123, 5]),
+    ('product_name', [None, 5]),
+    ('price_per_unit', ['abc', 5]),
+    ('price_per_unit', [None, 5]),
+    ('-quantity_in_stock', ['abc', 5]),
+    ('quantity_in_stock', [1.5, 5]),
+])
+def test_get_products_cursor_must_match_sort_column(client, sort, position):
+    response = client.get(f'/products?sort={sort}&cursor={encode_cursor(position)}')
+    assert response.status_code == 400
+
+def test_get_products_sorted_cursor_accepts_column_values(client):
+    for sort, position in (('product_name', ['Laptop', 1]), ('price_per_unit', [2, 3]),
+                           ('price_per_unit', [2.0, 3]), ('quantity_in_stock', [100, 3])):
+        response = client.get(f'/products?sort={sort}&cursor={encode_cursor(position)}')
+        assert response.status_code == 200
+
+def test_get_products_cursor_out_of_range(client):
+    assert client.get(f'/products?cursor={encode_cursor(2**70)}').status_code == 400
+    for position in ([2**70, 1], [100, 2**70]):
+        cursor = encode_cursor(position)
+        response = client.get(f'/products?sort=quantity_in_stock&cursor={cursor}')
+        assert response.status_code == 400
+
+def test_get_products_filtered(client):
+    def names(query):
+        response = client.get(f'/products?{query}')
+        assert response.status_code == 200
+        return [p['product_name'] for p in response.get_json()]
+
+    assert names('section_id=2') == ['Canned Beans', 'Soda']
+    assert names('min_price=2&max_price=500') == ['Smartphone', 'Canned Beans']
+    assert names('max_quantity=100') == ['Laptop', 'Canned Beans']
+    assert names('name_prefix=S') == ['Smartphone', 'Soda']
+    assert names('available=false') == []
+    assert names('sort=-price_per_unit') == ['Laptop', 'Smartphone', 'Canned Beans', 'Soda']
+
+def test_get_products_sorted_pages(client):
+    response = client.get('/products?sort=quantity_in_stock&limit=3')
+    assert [p['quantity_in_stock'] for p in response.get_json()] == [50, 100, 200]
+    next_url = response.headers['Link'].split(';')[0].strip('<>')
+    assert 'sort=quantity_in_stock' in next_url
+    assert [p['quantity_in_stock'] for p in client.get(next_url).get_json()] == [300]
+
+def test_get_products_invalid_filters(client):
+    assert client.get('/products?min_price=cheap').status_code == 400
+    assert client.get('/products?available=maybe').status_code == 400
+    assert client.get('/products?sort=section').status_code == 400
+    assert client.get('/products?section_id=99999999999999999999999').status_code == 400
+    assert client.get('/products?max_quantity=-99999999999999999999999').status_code == 400
+    assert client.delete('/products?section_id=99999999999999999999999').status_code == 400
+    for value in ('nan', 'inf', '-inf', '2.5'):
+        assert client.get(f'/products?min_price={value}').status_code == 400
+        assert client.get(f'/products?max_price={value}').status_code == 400
+
+def test_get_products_name_prefix_at_code_point_edges(client):
+    for name in ('\ud7ffBox', '\ud7ff', 'Z\U0010ffff', '\U0010ffff\U0010ffff'):
+        client.post('/products', json={
+            'section_id': 1,
+            'product_name': name,
+            'quantity_in_stock': 1,
+            'price_per_unit': 1,
+            'is_product_available': True,
+        })
+
+    def names(prefix):
+        response = client.get('/products', query_string={'name_prefix': prefix})
+        assert response.status_code == 200
+        return sorted(p['product_name'] for p in response.get_json())
+
+    assert client.get('/products?name_prefix=%ED%9F%BF').status_code == 200
+    assert names('\ud7ff') == ['\ud7ff', '\ud7ffBox']
+    assert names('Z\U0010ffff') == ['Z\U0010ffff']
+    assert names('\U0010ffff') == ['\U0010ffff\U0010ffff']
+
+def test_prefix_upper_bound():
+    assert prefix_upper_bound('ab') == 'ac'
+    assert prefix_upper_bound('a\ud7ff') == 'a\ue000'
+    assert prefix_upper_bound('a\U0010ffff') == 'b'
+    assert prefix_upper_bound('\U0010ffff') is None
+
+@pytest.mark.parametrize('filters, sort, index', [
+    ({'section_id': 1}, 'product_id', 'ix_products_section_id'),
+    ({'available': True}, 'product_id', 'ix_products_is_product_available'),
+    ({'min_price': 10}, 'price_per_unit', 'ix_products_price_per_unit'),
+    ({'max_price': 10}, '-price_per_unit', 'ix_products_price_per_unit'),
+    ({'max_quantity': 10}, 'quantity_in_stock', 'ix_products_quantity_in_stock'),
+    ({'name_prefix': 'La'}, 'product_name', 'ix_products_product_name'),
+])
+def test_product_filters_use_index(app, filters, sort, index):
+    with app.app_context():
+        query = filtered_products_query(filters, sort).limit(10)
+        sql = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+        plan = db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}')).all()
+    assert f'USING INDEX {index}' in plan[0][3]
+    assert not any('TEMP B-TREE' in row[3] for row in plan)
+
+def test_get_products_fields_projection(client, query_counter):
+    response = client.get('/products?fields=product_name,price_per_unit')
+    assert response.status_code == 200
+    assert response.get_json()[0] == {'product_name': 'Laptop', 'price_per_unit': 1000}
+    assert 'sections' not in query_counter[-1]
+
+    response = client.get('/products?fields=section&sort=-price_per_unit&limit=3')
+    assert [p['section'] for p in response.get_json()] == ['Electronics'] * 2 + ['Food and Drinks']
+    next_url = response.headers['Link'].split(';')[0].strip('<>')
+    assert client.get(next_url).get_json() == [{'section': 'Food and Drinks'}]
+
+def test_get_products_invalid_fields(client):
+    assert client.get('/products?fields=cost').status_code == 400
+    assert client.get('/products?fields=').status_code == 400
+
+def test_product_rows_skip_the_orm(app):
+    with app.app_context():
+        db.session.remove()
+        rows = ProductService.get_product_rows(PRODUCT_FIELDS)
+        assert len(rows) == 4
+        assert len(db.session.identity_map) == 0
+        assert rows_to_dicts(PRODUCT_FIELDS, rows) == [
+            product.to_dict() for product in ProductService.get_all_products()
+        ]
+
+def test_batch_get_products(client, query_counter):
+    response = client.post('/products/batch-get', json={'ids': [3, 99, 1, 3]})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [p['product_name'] for p in data['items']] == ['Canned Beans', 'Laptop']
+    assert data['items'][0]['section'] == 'Food and Drinks'
+    assert data['missing'] == [99]
+    assert len(query_counter) == 1
+
+def test_batch_get_products_chunks_ids(client, query_counter, monkeypatch):
+    monkeypatch.setattr('app.services.IN_CHUNK_SIZE', 2)
+    response = client.post('/products/batch-get?fields=product_id', json={'ids': [4, 3, 2, 1, 5]})
+    assert response.get_json() == {
+        'items': [{'product_id': 4}, {'product_id': 3}, {'product_id': 2}, {'product_id': 1}],
+        'missing': [5],
+    }
+    assert len(query_counter) == 3
+
+def test_batch_get_products_invalid(client):
+    assert client.post('/products/batch-get', json={'ids': []}).status_code == 400
+    assert client.post('/products/batch-get', json={'ids': ['1']}).status_code == 400
+    assert client.post('/products/batch-get', json={'ids': list(range(1001))}).status_code == 400
+    assert client.post('/products/batch-get', json={'ids': [10**30]}).status_code == 400
+    assert client.post('/products/batch-get', json={'ids': [0]}).status_code == 400
+    assert client.post('/sections/batch-get', json={'ids': [10**30]}).status_code == 400
+    assert client.post('/products/batch-get?fields=cost', json={'ids': [1]}).status_code == 400
+
+def test_export_products_ndjson(client):
+    response = client.get('/products/export?format=ndjson')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)['product_name'] for line in lines] == [
+        'Laptop', 'Smartphone', 'Canned Beans', 'Soda'
+    ]
+
+def test_export_products_unsupported_format(client):
+    response = client.get('/products/export?format=xml')
+    assert response.status_code == 400
+
+def search_names(client, query):
+    response = client.get(f'/products/search?{query}')
+    assert response.status_code == 200
+    return [p['product_name'] for p in response.get_json()]
+
+def test_search_products(client):
+    assert search_names(client, 'q=lap') == ['Laptop']
+    assert sorted(search_names(client, 'q=FOOD')) == ['Canned Beans', 'Soda']
+    assert search_names(client, 'q=canned+drinks') == ['Canned Beans']
+    assert search_names(client, 'q="bean*') == ['Canned Beans']
+    assert search_names(client, 'q=tablet') == []
+
+def test_search_products_paginated(client):
+    response = client.get('/products/search?q=electronics&limit=1')
+    assert [p['product_name'] for p in response.get_json()] == ['Laptop']
+    next_url = response.headers['Link'].split(';')[0].strip('<>')
+    response = client.get(next_url)
+    assert [p['product_name'] for p in response.get_json()] == ['Smartphone']
+    assert 'Link' not in response.headers
+
+def test_search_products_follows_writes(client):
+    client.put('/products/1', json={
+        'section_id': 2,
+        'product_name': 'Tablet',
+        'quantity_in_stock': 5,
+        'price_per_unit': 300,
+        'is_product_available': True,
+    })
+    client.delete('/products/4')
+    client.put('/sections/2', json={'section_name': 'Pantry'})
+    assert search_names(client, 'q=laptop') == []
+    assert search_names(client, 'q=soda') == []
+    assert sorted(search_names(client, 'q=pantry')) == ['Canned Beans', 'Tablet']
+
+def test_search_products_requires_query(client):
+    assert client.get('/products/search').status_code == 400
+    assert client.get('/products/search?q=%22*').status_code == 400
+    assert client.get('/products/search?q=soda&cursor=bad').status_code == 400
+
+def test_search_products_rejects_crafted_cursor(client):
+    for position in ([None, 5], ['a', 5], [True, 5], [2**70, 5], [0.5, 2**70], [0.5, None]):
+        response = client.get(f'/products/search?q=soda&cursor={encode_cursor(position)}')
+        assert response.status_code == 400
+
 def test_get_product(client):
     response = client.get('/products/1')
     assert response.status_code == 200
     data = response.get_json()
     assert data['product_name'] == 'Laptop'
 
+def test_get_product_is_cached(client, query_counter):
+    client.get('/products/2')
+    query_counter.clear()
+    response = client.get('/products/2')
+    assert response.get_json()['product_name'] == 'Smartphone'
+    assert query_counter == []
+    assert client.get('/cache/stats').get_json()['hits'] >= 2
+
+def test_cached_product_reflects_section_rename(client):
+    client.get('/products/2')
+    client.put('/sections/1', json={'section_name': 'Tech'})
+    assert client.get('/products/2').get_json()['section'] == 'Tech'
+
+def test_cached_product_invalidated_on_update_and_delete(client):
+    client.get('/products/2')
+    client.put('/products/2', json={
+        'section_id': 2,
+        'product_name': 'Phone Charger',
+        'quantity_in_stock': 5,
+        'price_per_unit': 20,
+        'is_product_available': True,
+    })
+    data = client.get('/products/2').get_json()
+    assert (data['product_name'], data['section']) == ('Phone Charger', 'Food and Drinks')
+
+    client.delete('/sections/2')
+    assert client.get('/products/2').status_code == 404
+    assert client.get('/products/3').status_code == 404
+
 def test_get_nonexistent_product(client):
     response = client.get('/products/999')
     assert response.status_code == 404
@@ -26,6 +372,17 @@ def test_create_product(client):
     data = response.get_json()
     assert data['product_name'] == 'Tablet'
 
+def test_create_product_with_invalid_data(client):
+    response = client.post('/products', json={
+        'section_id': 1,
+        'product_name': 'Tablet',
+        'quantity_in_stock': 'thirty',
+        'price_per_unit': 300,
+        'is_product_available': True,
+    })
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Invalid data:')
+
 def test_create_product_with_invalid_section(client):
     response = client.post('/products', json={
         'section_id': 999,
@@ -36,6 +393,21 @@ def test_create_product_with_invalid_section(client):
     })
     assert response.status_code == 400
 
+def test_product_write_to_section_deleted_elsewhere(client):
+    # Another worker deleted section 3 after this worker cached it.
+    service_cache.set(section_cache_key(3), {'section_id': 3, 'section_name': 'Gone'})
+    product = {
+        'section_id': 3,
+        'product_name': 'Drill',
+        'quantity_in_stock': 1,
+        'price_per_unit': 1,
+        'is_product_available': True,
+    }
+    assert client.post('/products', json=product).status_code == 400
+    assert client.put('/products/1', json=product).status_code == 404
+    assert client.patch('/products/1', json={'section_id': 3}).status_code == 400
+    assert client.get('/products/1').get_json()['section_id'] == 1
+
 def test_create_existing_product(client):
     response = client.post('/products', json={
         'section_id': 1,
@@ -46,6 +418,96 @@ def test_create_existing_product(client):
     })
     assert response.status_code == 400
 
+def test_bulk_create_products(client):
+    response = client.post('/products/bulk', json=[
+        {'section_id': 1, 'product_name': 'Tablet', 'quantity_in_stock': 30,
+         'price_per_unit': 300, 'is_product_available': True},
+        {'section_id': 1, 'product_name': 'Laptop', 'quantity_in_stock': 30,
+         'price_per_unit': 300, 'is_product_available': True},
+        {'section_id': 999, 'product_name': 'Ghost', 'quantity_in_stock': 1,
+         'price_per_unit': 1, 'is_product_available': True},
+        {'section_id': 2, 'product_name': 'Juice'},
+    ])
+    assert response.status_code == 200
+    data = response.get_json()
+    assert (data['created'], data['updated'], data['failed']) == (1, 0, 3)
+    assert [r['status'] for r in data['results']] == ['created', 'error', 'error', 'error']
+    assert client.get(f"/products/{data['results'][0]['product_id']}").status_code == 200
+
+def test_bulk_upsert_products(client):
+    response = client.post('/products/bulk?upsert=true', json=[
+        {'section_id': 1, 'product_name': 'Laptop', 'quantity_in_stock': 7,
+         'price_per_unit': 950, 'is_product_available': True},
+        {'section_id': 2, 'product_name': 'Juice', 'quantity_in_stock': 40,
+         'price_per_unit': 3, 'is_product_available': True},
+    ])
+    data = response.get_json()
+    assert [r['status'] for r in data['results']] == ['updated', 'created']
+    assert data['results'][0]['product_id'] == 1
+    assert client.get('/products/1').get_json()['quantity_in_stock'] == 7
+
+def test_bulk_create_products_rejects_non_array(client):
+    response = client.post('/products/bulk', json={'product_name': 'Tablet'})
+    assert response.status_code == 400
+
+def test_move_product_stock(client, query_counter):
+    client.get('/products/1')
+    query_counter.clear()
+    response = client.post('/products/1/stock', json={'delta': -50})
+    assert response.status_code == 200
+    assert response.get_json() == {
+        'product_id': 1, 'quantity_in_stock': 0, 'is_product_available': False
+    }
+    assert [s.split()[0] for s in query_counter] == ['UPDATE', 'UPDATE', 'INSERT']
+    assert client.get('/products/1').get_json()['is_product_available'] is False
+
+    response = client.post('/products/1/stock', json={'delta': 5})
+    assert response.get_json()['is_product_available'] is True
+
+def test_move_product_stock_errors(client):
+    assert client.post('/products/1/stock', json={'delta': -51}).status_code == 409
+    assert client.get('/products/1').get_json()['quantity_in_stock'] == 50
+    assert client.post('/products/999/stock', json={'delta': 1}).status_code == 404
+    assert client.post('/products/1/stock', json={'delta': 0}).status_code == 400
+    assert client.post('/products/1/stock', json={'delta': '1'}).status_code == 400
+
+def test_move_product_stock_rejects_huge_delta(client):
+    for delta in (10**30, -10**30, 2**62):
+        assert client.post('/products/1/stock', json={'delta': delta}).status_code == 400
+    response = client.post('/stock/movements', json=[
+        {'product_id': 1, 'delta': 10**30},
+        {'product_id': 10**30, 'delta': 1},
+        {'product_id': 1, 'delta': 1},
+    ])
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [r['status'] for r in results] == ['error', 'error', 'applied']
+    assert all(r['error'].startswith('Invalid data') for r in results[:2])
+    assert client.get('/products/1').get_json()['quantity_in_stock'] == 51
+
+def test_move_stock_batch(client):
+    response = client.post('/stock/movements', json=[
+        {'product_id': 1, 'delta': -20},
+        {'product_id': 1, 'delta': -40},
+        {'product_id': 999, 'delta': 1},
+        {'product_id': 2},
+        {'product_id': 2, 'delta': 10},
+    ])
+    assert response.status_code == 200
+    data = response.get_json()
+    assert (data['applied'], data['failed']) == (2, 3)
+    assert [r['status'] for r in data['results']] == [
+        'applied', 'error', 'error', 'error', 'applied'
+    ]
+    assert data['results'][1]['error'] == 'Not enough stock of product ID 1 to apply -40'
+    assert data['results'][2]['error'] == 'Product with ID 999 not found'
+    assert client.get('/products/1').get_json()['quantity_in_stock'] == 30
+    assert client.get('/products/2').get_json()['quantity_in_stock'] == 210
+
+def test_move_stock_batch_rejects_non_array(client):
+    response = client.post('/stock/movements', json={'product_id': 1, 'delta': 1})
+    assert response.status_code == 400
+
 def test_update_product(client):
     response = client.put('/products/1', json={
         'section_id': 1,
@@ -58,6 +520,28 @@ def test_update_product(client):
     data = response.get_json()
     assert data['product_name'] == 'Updated Laptop'
 
+def test_update_product_to_existing_name(client):
+    response = client.put('/products/1', json={
+        'section_id': 1,
+        'product_name': 'Smartphone',
+        'quantity_in_stock': 45,
+        'price_per_unit': 900,
+        'is_product_available': True,
+    })
+    assert response.status_code == 404
+    assert client.get('/products/1').get_json()['product_name'] == 'Laptop'
+
+def test_create_product_skips_duplicate_check_query(client, query_counter):
+    client.post('/products', json={
+        'section_id': 1,
+        'product_name': 'Monitor',
+        'quantity_in_stock': 5,
+        'price_per_unit': 200,
+        'is_product_available': True,
+    })
+    selects = [q for q in query_counter if q.lstrip().upper().startswith('SELECT')]
+    assert not any('product_name = ' in q for q in selects)
+
 def test_update_nonexistent_product(client):
     response = client.put('/products/999', json={
         'section_id': 1,
@@ -68,6 +552,32 @@ def test_update_nonexistent_product(client):
     })
     assert response.status_code == 404
 
+def test_patch_product(client, query_counter):
+    client.get('/products/1')
+    query_counter.clear()
+    response = client.patch('/products/1', json={'price_per_unit': 900})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert (data['price_per_unit'], data['product_name'], data['section']) == (
+        900, 'Laptop', 'Electronics'
+    )
+    assert [s.split()[0] for s in query_counter] == ['UPDATE', 'UPDATE', 'INSERT']
+    assert client.get('/products/1').get_json()['price_per_unit'] == 900
+
+def test_patch_product_section(client):
+    response = client.patch('/products/1', json={'section_id': 2})
+    assert response.status_code == 200
+    assert response.get_json()['section'] == 'Food and Drinks'
+    assert client.patch('/products/1', json={'section_id': 999}).status_code == 400
+
+def test_patch_product_errors(client):
+    assert client.patch('/products/1', json={'product_name': 'Smartphone'}).status_code == 400
+    assert client.patch('/products/4', json={'section_id': 1, 'product_name': 'Laptop'}).status_code == 400
+    assert client.get('/products/4').get_json()['section_id'] == 2
+    assert client.patch('/products/1', json={}).status_code == 400
+    assert client.patch('/products/1', json={'price_per_unit': 'cheap'}).status_code == 400
+    assert client.patch('/products/999', json={'price_per_unit': 1}).status_code == 404
+
 def test_delete_product(client):
     response = client.delete('/products/1')
     assert response.status_code == 200
@@ -75,3 +585,78 @@ def test_delete_product(client):
 def test_delete_nonexistent_product(client):
     response = client.delete('/products/999')
     assert response.status_code == 404
+
+def test_delete_products_by_filter(client):
+    response = client.delete('/products?max_price=2')
+    assert response.status_code == 200
+    assert response.get_json() == {'deleted': 2}
+    assert [p['product_name'] for p in client.get('/products').get_json()] == ['Laptop', 'Smartphone']
+    assert client.get('/products/search?q=soda').get_json() == []
+
+def test_delete_products_in_chunks(client, query_counter):
+    client.get('/products/2')
+    response = client.delete('/products?section_id=1&chunk_size=1')
+    assert response.get_json() == {'deleted': 2}
+    assert len([s for s in query_counter if s.startswith('DELETE FROM products')]) == 2
+    assert client.get('/products/2').status_code == 404
+    assert client.get('/sections/1').status_code == 200
+
+def test_delete_products_requires_a_filter(client):
+    assert client.delete('/products').status_code == 400
+    assert client.delete('/products?chunk_size=10').status_code == 400
+    assert client.delete('/products?max_price=cheap').status_code == 400
+    assert len(client.get('/products').get_json()) == 4
+
+def test_openapi_spec(app, client):
+    response = client.get('/apispec_1.json')
+    assert response.status_code == 200
+    paths = response.get_json()['paths']
+    assert set(paths['/products/{product_id}']) == {'get', 'put', 'patch', 'delete'}
+    assert app.extensions['swagger'].apispecs
+
+def test_home_page_paginated(client):
+    response = client.get('/?limit=2')
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert 'Laptop' in html and 'Smartphone' in html
+    assert 'Soda' not in html
+    assert 'Food and Drinks' in html
+
+    next_url = html.split('href="')[-1].split('"')[0].replace('&amp;', '&')
+    html = client.get(next_url).get_data(as_text=True)
+    assert 'Canned Beans' in html and 'Laptop' not in html
+
+def test_home_page_is_cached_until_write(client, query_counter):
+    client.get('/')
+    query_counter.clear()
+    assert 'Tablet' not in client.get('/').get_data(as_text=True)
+    assert len(query_counter) == 1
+
+    client.post('/products', json={
+        'section_id': 1,
+        'product_name': 'Tablet',
+        'quantity_in_stock': 5,
+        'price_per_unit': 300,
+        'is_product_available': True,
+    })
+    assert 'Tablet' in client.get('/').get_data(as_text=True)
+
+def test_home_page_cache_only_holds_the_default_page(client):
+    home_page_cache.clear()
+    client.get('/?limit=2')
+    client.get(f'/?cursor={encode_cursor(1)}')
+    client.get('/?limit=1000')
+    assert len(home_page_cache.backend._entries) == 0
+    client.get('/')
+    client.get('/?limit=50')
+    assert len(home_page_cache.backend._entries) == 1
+
+def test_home_page_is_cached_without_the_service_cache(client, query_counter):
+    configure_cache(NullCache())
+    try:
+        client.get('/')
+        query_counter.clear()
+        client.get('/')
+        assert len(query_counter) == 1
+    finally:
+        configure_cache(LRUCache())
@@ -1,8 +1,44 @@
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.exc import IntegrityError
+from app.models import db, Product
+from app.services import SectionService
+
 def test_get_all_sections(client):
     response = client.get('/sections')
     assert response.status_code == 200
     data = response.get_json()
     assert len(data) == 2  
+
+def test_get_sections_etag_changes_on_rename(client):
+    etag = client.get('/sections').headers['ETag']
+    assert client.get('/sections', headers={'If-None-Match': etag}).status_code == 304
+    client.put('/sections/1', json={'section_name': 'Tech Gadgets'})
+    assert client.get('/sections', headers={'If-None-Match': etag}).status_code == 200
+
+def test_get_sections_paginated(client):
+    response = client.get('/sections?limit=1')
+    assert response.status_code == 200
+    assert [s['section_id'] for s in response.get_json()] == [1]
+
+    next_url = response.headers['Link'].split(';')[0].strip('<>')
+    response = client.get(next_url)
+    assert [s['section_id'] for s in response.get_json()] == [2]
+    assert 'Link' not in response.headers
+
+def test_get_sections_fields_projection(client):
+    response = client.get('/sections?fields=section_name&limit=1')
+    assert response.get_json() == [{'section_name': 'Electronics'}]
+    assert client.get('/sections?fields=name').status_code == 400
+
+def test_batch_get_sections(client):
+    response = client.post('/sections/batch-get?fields=section_name', json={'ids': [2, 9, 1]})
+    assert response.status_code == 200
+    assert response.get_json() == {
+        'items': [{'section_name': 'Food and Drinks'}, {'section_name': 'Electronics'}],
+        'missing': [9],
+    }
+
 def test_get_section(client):
     response = client.get('/sections/1')
     assert response.status_code == 200
@@ -13,6 +49,91 @@ def test_get_nonexistent_section(client):
     response = client.get('/sections/999')
     assert response.status_code == 404
 
+def test_get_section_summary(client):
+    response = client.get('/sections/1/summary')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['product_count'] == 2
+    assert data['total_units'] == 250
+    assert data['inventory_value'] == 50 * 1000 + 200 * 500
+    assert (data['available_count'], data['unavailable_count']) == (2, 0)
+
+def test_get_nonexistent_section_summary(client):
+    response = client.get('/sections/999/summary')
+    assert response.status_code == 404
+
+def test_get_inventory_summary(client, query_counter):
+    client.post('/sections', json={'section_name': 'Books'})
+    query_counter.clear()
+    data = client.get('/inventory/summary').get_json()
+    assert [s['product_count'] for s in data['sections']] == [2, 2, 0]
+    assert data['totals']['section_count'] == 3
+    assert data['totals']['total_units'] == 650
+    assert data['totals']['inventory_value'] == 150000 + 200 + 300
+    assert len(query_counter) == 2
+
+def test_section_summary_reads_counters(client, query_counter):
+    client.get('/sections/1/summary')
+    assert 'section_stats' in query_counter[-1]
+    assert 'products' not in query_counter[-1]
+
+def summary(client, section_id):
+    data = client.get(f'/sections/{section_id}/summary').get_json()
+    return data['product_count'], data['total_units'], data['inventory_value'], data['available_count']
+
+def test_section_stats_follow_every_write(app, client):
+    books = client.post('/sections', json={'section_name': 'Books'}).get_json()['section_id']
+    assert summary(client, books) == (0, 0, 0, 0)
+    dune = client.post('/products', json={
+        'section_id': books, 'product_name': 'Dune', 'quantity_in_stock': 5,
+        'price_per_unit': 10, 'is_product_available': True,
+    }).get_json()['product_id']
+    client.post('/products/bulk?upsert=true', json=[
+        {'section_id': books, 'product_name': 'Emma', 'quantity_in_stock': 2,
+         'price_per_unit': 4, 'is_product_available': False},
+        {'section_id': 1, 'product_name': 'Laptop', 'quantity_in_stock': 10,
+         'price_per_unit': 1000, 'is_product_available': True},
+    ])
+    assert summary(client, books) == (2, 7, 58, 1)
+    assert summary(client, 1) == (2, 210, 10000 + 100000, 2)
+
+    client.post(f'/products/{dune}/stock', json={'delta': -5})
+    client.post('/stock/movements', json=[{'product_id': 2, 'delta': -100}])
+    assert summary(client, books) == (2, 2, 8, 0)
+    assert summary(client, 1) == (2, 110, 10000 + 50000, 2)
+
+    client.patch('/products/2', json={'section_id': books, 'price_per_unit': 1})
+    client.put('/products/3', json={
+        'section_id': books, 'product_name': 'Canned Beans', 'quantity_in_stock': 1,
+        'price_per_unit': 2, 'is_product_available': True,
+    })
+    assert summary(client, books) == (4, 103, 110, 2)
+    assert summary(client, 1) == (1, 10, 10000, 1)
+    assert summary(client, 2) == (1, 300, 300, 1)
+
+    client.delete('/products/1')
+    client.delete(f'/products?section_id={books}&max_quantity=0')
+    assert summary(client, 1) == (0, 0, 0, 0)
+    assert summary(client, books) == (3, 103, 110, 2)
+    client.delete(f'/sections/{books}?chunk_size=2')
+    client.delete('/sections/2')
+    with app.app_context():
+        assert SectionService.check_section_stats() == []
+        assert db.session.execute(text('SELECT count(*) FROM section_stats')).scalar() == 1
+
+def test_check_and_rebuild_section_stats(app):
+    with app.app_context():
+        db.session.execute(text('UPDATE section_stats SET product_count = 7 WHERE section_id = 1'))
+        db.session.execute(text('DELETE FROM section_stats WHERE section_id = 2'))
+        db.session.commit()
+        drifted = SectionService.check_section_stats()
+        assert [(d['section_id'], d['stored'] and d['stored']['product_count']) for d in drifted] == [
+            (1, 7), (2, None)
+        ]
+        assert drifted[0]['expected']['product_count'] == 2
+        assert SectionService.rebuild_section_stats() == 2
+        assert SectionService.check_section_stats() == []
+
 def test_create_section(client):
     response = client.post('/sections', json={'section_name': 'Books'})
     assert response.status_code == 201
@@ -29,14 +150,67 @@ def test_update_section(client):
     data = response.get_json()
     assert data['section_name'] == 'Tech Gadgets'
 
+def test_update_section_to_existing_name(client):
+    response = client.put('/sections/1', json={'section_name': 'Food and Drinks'})
+    assert response.status_code == 400
+    assert client.get('/sections/1').get_json()['section_name'] == 'Electronics'
+
 def test_update_nonexistent_section(client):
     response = client.put('/sections/999', json={'section_name': 'New Section'})
     assert response.status_code == 404
 
+def test_patch_section(client, query_counter):
+    client.get('/sections/1')
+    query_counter.clear()
+    response = client.patch('/sections/1', json={'section_name': 'Tech Gadgets'})
+    assert response.status_code == 200
+    assert response.get_json() == {'section_id': 1, 'section_name': 'Tech Gadgets'}
+    assert [s.split()[0] for s in query_counter] == ['UPDATE', 'UPDATE', 'INSERT']
+    assert client.get('/sections/1').get_json()['section_name'] == 'Tech Gadgets'
+
+def test_patch_section_errors(client):
+    assert client.patch('/sections/1', json={'section_name': 'Food and Drinks'}).status_code == 400
+    assert client.patch('/sections/1', json={}).status_code == 400
+    assert client.patch('/sections/1', json={'color': 'red'}).status_code == 400
+    assert client.patch('/sections/999', json={'section_name': 'New'}).status_code == 404
+
 def test_delete_section(client):
     response = client.delete('/sections/1')
     assert response.status_code == 200
 
+def test_delete_section_cascades_to_products(client):
+    assert client.get('/products/1').status_code == 200
+    client.delete('/sections/1')
+    assert client.get('/products/1').status_code == 404
+    assert client.get('/products?section_id=1').get_json() == []
+    assert client.get('/products/search?q=laptop').get_json() == []
+    assert len(client.get('/products').get_json()) == 2
+
+def test_delete_section_in_chunks(client, query_counter):
+    response = client.delete('/sections/1?chunk_size=1')
+    assert response.status_code == 200
+    deletes = [s for s in query_counter if s.startswith('DELETE FROM products')]
+    assert len(deletes) == 2
+    assert client.get('/products?section_id=1').get_json() == []
+    assert client.get('/sections/1').status_code == 404
+
+def test_delete_section_invalid_chunk_size(client):
+    for chunk_size in ('0', '501', 'x'):
+        response = client.delete(f'/sections/1?chunk_size={chunk_size}')
+        assert response.status_code == 400
+    assert client.get('/sections/1').status_code == 200
+
+def test_products_require_an_existing_section(app):
+    with app.app_context():
+        with pytest.raises(IntegrityError):
+            db.session.execute(insert(Product).values(
+                section_id=999,
+                product_name='Orphan',
+                quantity_in_stock=1,
+                price_per_unit=1,
+            ))
+        db.session.rollback()
+
 def test_delete_nonexistent_section(client):
     response = client.delete('/sections/999')
     assert response.status_code == 404
@@ -0,0 +1,131 @@
+import json
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs os.fork')
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def request(port, method, path, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(
+        f'http://127.0.0.1:{port}{path}',
+        data=data,
+        method=method,
+        headers={'Content-Type': 'application/json'},
+    )
+    with urllib.request.urlopen(req, timeout=10) as response:
+        return response.status, json.loads(response.read() or 'null')
+
+
+@pytest.fixture
+def server(tmp_path):
+    port = free_port()
+    database = tmp_path / 'warehouse.db'
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'main.py'), 'serve',
+         '--workers', '2', '--port', str(port), '--graceful-timeout', '10'],
+        cwd=tmp_path,
+        env={**os.environ, 'DATABASE_URL': f'sqlite:///{database}', 'LOG_LEVEL': 'WARNING'},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        # Own process group, so teardown can reach workers the master left.
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + 20
+    while True:
+        try:
+            request(port, 'GET', '/sections')
+            break
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                stop(process)
+                pytest.fail('server did not start')
+            time.sleep(0.1)
+    yield process, port, database
+    stop(process)
+
+
+def stop(process):
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(15)
+        except subprocess.TimeoutExpired:
+            pass
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.wait()
+
+
+def accepts_connections(port):
+    try:
+        with socket.create_connection(('127.0.0.1', port), timeout=1):
+            return True
+    except OSError:
+        return False
+
+
+def test_workers_serve_fresh_data(server):
+    process, port, _ = server
+    status, section = request(port, 'POST', '/sections', {'section_name': 'Tools'})
+    assert status == 201
+    path = f'/sections/{section["section_id"]}'
+    for _ in range(10):
+        assert request(port, 'GET', path)[1]['section_name'] == 'Tools'
+
+    request(port, 'PUT', path, {'section_name': 'Garden'})
+    for _ in range(10):
+        assert request(port, 'GET', path)[1]['section_name'] == 'Garden'
+
+
+def test_sigterm_finishes_the_request_in_progress(server):
+    process, port, database = server
+    # Hold the write lock so the next write waits inside a worker.
+    blocker = sqlite3.connect(database, isolation_level=None)
+    blocker.execute('BEGIN IMMEDIATE')
+    results = []
+    writer = threading.Thread(
+        target=lambda: results.append(
+            request(port, 'POST', '/sections', {'section_name': 'Late'})
+        )
+    )
+    writer.start()
+    time.sleep(0.5)
+
+    process.send_signal(signal.SIGTERM)
+    time.sleep(0.5)
+    assert process.poll() is None
+    blocker.execute('ROLLBACK')
+    blocker.close()
+
+    writer.join(10)
+    assert results and results[0][0] == 201
+    assert process.wait(10) == 0
+
+
+def test_workers_exit_when_the_master_is_killed(server):
+    process, port, _ = server
+    process.kill()
+    process.wait()
+    deadline = time.monotonic() + 10
+    while accepts_connections(port):
+        assert time.monotonic() < deadline, 'workers outlived the master'
+        time.sleep(0.2)